@@ -0,0 +1,78 @@
+"""Compara la memoria que ocupan los commits cargados con el modelo actual
+(clases con __slots__, CommitFile, cadenas compartidas y fechas como números)
+y con la representación anterior (atributos en __dict__, archivos como
+diccionarios y fechas ISO).
+
+Uso: python benchmark_memoria.py [cantidad_de_commits]
+"""
+import datetime
+import json
+import random
+import sys
+import tracemalloc
+
+from main import Commit
+
+AUTHORS = [f"usuario{i}@example.com" for i in range(20)]
+BRANCHES = ["main", "desarrollo", "feature/login", "hotfix"]
+FILE_NAMES = [f"src/modulo_{i}.py" for i in range(200)]
+
+class CommitAntiguo:
+    """Commit con la representación anterior, para comparar: solo los
+    atributos que tenía entonces"""
+    def __init__(self, data):
+        self.id = data["id"]
+        self.timestamp = datetime.datetime.fromtimestamp(data["timestamp"]).isoformat()
+        self.author_email = data["author_email"]
+        self.message = data["message"]
+        self.parent_id = data["parent_id"]
+        self.files = data["files"]
+        self.branch_name = data["branch_name"]
+
+def generate_records(count: int, seed: int = 42):
+    """Genera commits sintéticos como líneas JSON, igual que en el diario"""
+    rng = random.Random(seed)
+    records = []
+    parent_id = None
+    for generation in range(1, count + 1):
+        commit_id = f"{rng.getrandbits(40):010x}"
+        names = rng.sample(FILE_NAMES, rng.randint(1, 4))
+        records.append(json.dumps({
+            "id": commit_id,
+            "timestamp": 1700000000 + generation * 60.5,
+            "author_email": rng.choice(AUTHORS),
+            "message": f"Cambio {generation}",
+            "parent_id": parent_id,
+            "parent_ids": [parent_id] if parent_id else [],
+            "generation": generation,
+            "files": [{"name": name, "status": rng.choice("AM"),
+                       "checksum": f"{rng.getrandbits(160):040x}", "path": name}
+                      for name in names],
+            "branch_name": rng.choice(BRANCHES),
+            "conflicts": []
+        }))
+        parent_id = commit_id
+    return records
+
+def measure(records, build) -> int:
+    """Bytes que quedan ocupados tras decodificar y construir todos los commits"""
+    tracemalloc.start()
+    commits = [build(json.loads(record)) for record in records]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del commits
+    return size
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    records = generate_records(count)
+
+    before = measure(records, CommitAntiguo)
+    after = measure(records, Commit.from_dict)
+    print(f"Commits: {count}")
+    print(f"Representación anterior: {before / count:8.1f} bytes por commit ({before / 2**20:.1f} MiB)")
+    print(f"Representación actual:   {after / count:8.1f} bytes por commit ({after / 2**20:.1f} MiB)")
+    print(f"Reducción: {100 * (1 - after / before):.1f}%")
+
+if __name__ == "__main__":
+    main()
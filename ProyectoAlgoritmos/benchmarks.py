@@ -0,0 +1,231 @@
+"""Benchmarks de las estructuras de datos y los comandos de main.py.
+
+Genera un repositorio sintético (commits, ramas, archivos y pull requests
+configurables, con semilla fija para que sea reproducible) en un
+directorio temporal, mide cada operación varias veces y escribe los
+resultados como JSON. Con --compare se comparan contra los resultados de
+otra revisión y se marcan las regresiones.
+
+El mismo script funciona con las revisiones anteriores a las
+optimizaciones (para generar la línea base de --compare): lo que no
+existe allí se reemplaza por su equivalente o se omite.
+
+Uso:
+    python benchmarks.py --commits 2000 --output actual.json
+    python benchmarks.py --commits 2000 --compare base.json
+"""
+import argparse
+import contextlib
+import inspect
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import main
+from main import File, GitSystem, Queue, Stack
+
+EMAIL = "benchmark@example.com"
+
+def mark_dirty(git_system: GitSystem, repo):
+    """Marca un repositorio para el próximo guardado (las revisiones
+    antiguas no lo necesitan: guardan todo siempre)"""
+    if hasattr(git_system, "_mark_dirty"):
+        git_system._mark_dirty(repo)
+
+def build_repository(git_system: GitSystem, name: str, commits: int, branches: int,
+                     files: int, prs: int, seed: int = 42):
+    """Crea un repositorio sintético y lo guarda en disco"""
+    rng = random.Random(seed)
+    repo = git_system.create_repository(name, f"./{name}")
+    file_names = [f"src/modulo_{i}.py" for i in range(files)]
+    branch_names = ["main"] + [f"rama-{i}" for i in range(branches - 1)]
+
+    for i in range(commits):
+        if i == 1:
+            # Las ramas parten del primer commit
+            for branch_name in branch_names[1:]:
+                repo.create_branch(branch_name)
+        if i > 0:
+            repo.checkout_branch(rng.choice(branch_names))
+        for file_name in rng.sample(file_names, min(len(file_names), rng.randint(1, 3))):
+            content = f"# {file_name}\nversion = {i}\n"
+            file = repo.files.get(file_name)
+            if file:
+                file.update_content(content)
+            else:
+                file = File(file_name, content)
+            repo.add_file_to_staging(file)
+        repo.create_commit(f"Cambio {i}", EMAIL)
+
+    repo.checkout_branch("main")
+    for i in range(prs):
+        source = rng.choice(branch_names[1:] or branch_names)
+        repo.create_pull_request(f"PR {i}", "Generado por el benchmark", EMAIL, source, "main")
+
+    mark_dirty(git_system, repo)
+    git_system._save_data()
+    return repo
+
+def run_benchmark(name: str, operation, setup=None, repeat: int = 5, number: int = 1) -> dict:
+    """Mide `operation` `repeat` veces; cada medición ejecuta `number` operaciones
+    sobre el estado que retorna `setup` (que no se mide)"""
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        operation(state)
+        times.append((time.perf_counter() - start) / number)
+    return {
+        "name": name,
+        "repeat": repeat,
+        "number": number,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times)
+    }
+
+def run_suite(args) -> list:
+    """Ejecuta todos los benchmarks dentro del directorio de trabajo actual"""
+    results = []
+    git_system = GitSystem()
+    repo = build_repository(git_system, "bench", args.commits, args.branches,
+                            args.files, args.prs, args.seed)
+    commits = repo.commits.to_list()
+    pull_requests = repo.pull_requests.to_list()
+    repeat = args.repeat
+
+    # Estructuras de datos: búsqueda del último elemento (peor caso)
+    last_commit_id = commits[-1].id
+    results.append(run_benchmark(
+        "LinkedList.find", lambda _: repo.commits.find("id", last_commit_id), repeat=repeat))
+
+    def fill_stack():
+        stack = Stack()
+        for commit in commits:
+            stack.push(commit)
+        return stack
+
+    def pop_all(stack):
+        while not stack.is_empty():
+            stack.pop()
+
+    results.append(run_benchmark("Stack.pop", pop_all, fill_stack, repeat, len(commits)))
+
+    queue = Queue()
+    for pr in pull_requests:
+        queue.enqueue(pr)
+    last_pr_id = pull_requests[-1].id if pull_requests else None
+    results.append(run_benchmark("Queue.find", lambda _: queue.find("id", last_pr_id), repeat=repeat))
+    # En las revisiones antiguas pull_requests es una Queue y esto mide Queue.find
+    results.append(run_benchmark(
+        "PullRequestQueue.find", lambda _: repo.pull_requests.find("id", last_pr_id), repeat=repeat))
+
+    # Comandos
+    counter = iter(range(sys.maxsize))
+
+    def stage_file():
+        file = repo.files.get("src/modulo_0.py") or File("src/modulo_0.py", "")
+        file.update_content(f"# benchmark {next(counter)}\n")
+        repo.add_file_to_staging(file)
+
+    results.append(run_benchmark(
+        "create_commit", lambda _: repo.create_commit("Benchmark", EMAIL), stage_file, repeat))
+    git_system.current_repository = repo
+    results.append(run_benchmark("_git_status", lambda _: git_system._git_status(), repeat=repeat))
+    results.append(run_benchmark("_git_log", lambda _: git_system._git_log(), repeat=repeat))
+    if "limit" in inspect.signature(GitSystem._git_log).parameters:
+        results.append(run_benchmark("_git_log -n 10", lambda _: git_system._git_log(10), repeat=repeat))
+    results.append(run_benchmark(
+        "_save_data", lambda _: git_system._save_data(), lambda: mark_dirty(git_system, repo), repeat))
+
+    # El constructor ya carga el índice: se construye en setup y solo se mide la carga
+    results.append(run_benchmark("_load_data", lambda system: system._load_data(), GitSystem, repeat))
+    if hasattr(GitSystem, "_read_repository"):
+        read_repository = lambda _: GitSystem()._read_repository("bench")
+    else:
+        # Sin carga diferida el constructor lee todos los repositorios
+        read_repository = lambda _: GitSystem().get_repository("bench")
+    results.append(run_benchmark("_read_repository", read_repository, repeat=repeat))
+    return results
+
+def compare(results: list, baseline: dict, tolerance: float) -> bool:
+    """Muestra la variación respecto de otra revisión; retorna True si hubo regresiones"""
+    previous = {result["name"]: result for result in baseline["results"]}
+    regressions = False
+    print(f"{'Benchmark':<24}{'Antes':>14}{'Ahora':>14}{'Cambio':>10}")
+    for result in results:
+        before = previous.get(result["name"])
+        if before is None:
+            print(f"{result['name']:<24}{'-':>14}{result['median']:>14.3e}{'nuevo':>10}")
+            continue
+        change = result["median"] / before["median"] - 1 if before["median"] else 0.0
+        mark = ""
+        if change > tolerance:
+            mark = "  REGRESIÓN"
+            regressions = True
+        print(f"{result['name']:<24}{before['median']:>14.3e}{result['median']:>14.3e}{change:>+10.1%}{mark}")
+    return regressions
+
+def _revision() -> str:
+    """Commit de git del código medido, si está disponible"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocida"
+
+def main_benchmarks(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks del sistema Git simulado")
+    parser.add_argument("--commits", type=int, default=1000)
+    parser.add_argument("--branches", type=int, default=5)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--prs", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto, salida estándar)")
+    parser.add_argument("--compare", help="Resultados JSON de otra revisión para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="Aumento relativo de la mediana considerado regresión")
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # Los datos se guardan en data/ relativo al directorio actual
+        os.chdir(workdir)
+        try:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results = run_suite(args)
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "revision": _revision(),
+        "python": platform.python_version(),
+        "codec": main.get_codec().name if hasattr(main, "get_codec") else "json",
+        "parameters": {"commits": args.commits, "branches": args.branches, "files": args.files,
+                       "prs": args.prs, "repeat": args.repeat, "seed": args.seed},
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    elif not baseline_path:
+        print(text)
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        return 1 if compare(results, baseline, args.tolerance) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_benchmarks())
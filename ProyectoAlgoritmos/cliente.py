@@ -0,0 +1,93 @@
+"""Cliente del servidor de comandos (servidor.py).
+
+Lee comandos como en el modo interactivo de main.py, los envía al servidor
+y muestra lo que imprimieron; con --json muestra las respuestas completas.
+
+Uso:
+    python cliente.py --port 9418
+    echo "git log -n 5" | python cliente.py --unix /tmp/git.sock --json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+
+from servidor import DEFAULT_PORT, MAX_LINE
+
+class GitClient:
+    """Conexión con el servidor; las peticiones se responden en orden"""
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self._ids = itertools.count(1)
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = DEFAULT_PORT, unix_path: str = None):
+        if unix_path:
+            reader, writer = await asyncio.open_unix_connection(unix_path, limit=MAX_LINE)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE)
+        return cls(reader, writer)
+
+    async def request(self, line: str = None, command: str = None, args=None) -> dict:
+        """Envía un comando (una línea completa, o comando y argumentos) y espera su respuesta"""
+        request = {"id": next(self._ids)}
+        if line is not None:
+            request["line"] = line
+        else:
+            request["command"] = command
+            request["args"] = list(args or [])
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+
+        response = await self.reader.readline()
+        if not response:
+            raise ConnectionError("El servidor cerró la conexión.")
+        return json.loads(response)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+async def _run(args):
+    client = await GitClient.connect(args.host, args.port, args.unix)
+    interactive = sys.stdin.isatty()
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            if interactive:
+                print("git> ", end="", flush=True)
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:
+                break
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.lower() in ["exit", "quit", "q"]:
+                break
+
+            response = await client.request(line)
+            if args.json:
+                print(json.dumps(response, indent=2, ensure_ascii=False))
+                continue
+            print(response.get("output", ""), end="")
+            if "error" in response:
+                print(f"Error: {response['error']}")
+    finally:
+        await client.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cliente del servidor de comandos Git")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="RUTA", help="Conectarse a un socket Unix en lugar de TCP")
+    parser.add_argument("--json", action="store_true", help="Mostrar las respuestas completas")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_run(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Generador de carga para el servidor de comandos (servidor.py).
+
+Abre varias conexiones concurrentes; cada una trabaja en su propia rama de
+uno de los repositorios de prueba y repite una mezcla de add, commit,
+status y log. Al terminar muestra el rendimiento (comandos por segundo) y
+las latencias por comando vistas desde el cliente.
+
+Las conexiones que comparten repositorio se turnan su candado de
+escritura; el área de staging es de cada sesión, así que un commit solo
+lleva los archivos que añadió esa conexión.
+
+Uso:
+    python generador_carga.py --clients 16 --iterations 50 --repos 4
+    python generador_carga.py --unix /tmp/git.sock --output carga.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from cliente import GitClient
+from main import _print_latency_report, summarize_latencies
+from servidor import DEFAULT_PORT
+
+EMAIL = "carga@example.com"
+
+async def _timed(client: GitClient, records: list, name: str, line: str) -> dict:
+    """Envía un comando y registra su latencia de ida y vuelta"""
+    start = time.perf_counter()
+    response = await client.request(line)
+    records.append({"command": name, "seconds": time.perf_counter() - start, "ok": response["ok"]})
+    return response
+
+async def prepare(args):
+    """Crea los repositorios de prueba que falten, con un commit inicial"""
+    client = await GitClient.connect(args.host, args.port, args.unix)
+    try:
+        await client.request(f"email {EMAIL}")
+        for i in range(args.repos):
+            name = f"carga-{i}"
+            if (await client.request(f"use {name}"))["ok"]:
+                continue
+            await client.request(f"init {name}")
+            await client.request("add README.md")
+            await client.request("commit -m 'Commit inicial'")
+    finally:
+        await client.close()
+
+async def run_client(args, number: int, records: list):
+    """Una conexión: su propia rama en uno de los repositorios"""
+    client = await GitClient.connect(args.host, args.port, args.unix)
+    try:
+        await client.request(f"email {EMAIL}")
+        await client.request(f"use carga-{number % args.repos}")
+        branch = f"cliente-{number}-{int(time.time())}"
+        await client.request(f"branch {branch}")
+        await client.request(f"checkout {branch}")
+        for i in range(args.iterations):
+            await _timed(client, records, "add", f"add cliente_{number}/archivo_{i % 10}.txt")
+            await _timed(client, records, "commit", f"commit -m 'Carga {number}.{i}'")
+            await _timed(client, records, "status", "status")
+            await _timed(client, records, "log", "log -n 10")
+    finally:
+        await client.close()
+
+async def run_load(args) -> dict:
+    await prepare(args)
+    records = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(args, number, records) for number in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    return {
+        "clients": args.clients,
+        "iterations": args.iterations,
+        "repos": args.repos,
+        "commands": len(records),
+        "errors": sum(1 for record in records if not record["ok"]),
+        "seconds": elapsed,
+        "throughput": len(records) / elapsed if elapsed else 0.0,
+        "latencies": summarize_latencies(records)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generador de carga para el servidor de comandos Git")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="RUTA", help="Conectarse a un socket Unix en lugar de TCP")
+    parser.add_argument("--clients", type=int, default=8, help="Conexiones concurrentes")
+    parser.add_argument("--iterations", type=int, default=25, help="Rondas de add/commit/status/log por conexión")
+    parser.add_argument("--repos", type=int, default=2,
+                        help="Repositorios entre los que se reparten las conexiones")
+    parser.add_argument("--output", help="Archivo JSON con los resultados")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run_load(args))
+    print(f"{result['commands']} comandos en {result['seconds']:.2f} s "
+          f"({result['throughput']:.1f} comandos/s, {result['errors']} errores)", file=sys.stderr)
+    _print_latency_report(result["latencies"])
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
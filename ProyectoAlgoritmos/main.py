@@ -1,18 +1,287 @@
 import os
 import json
+from collections import OrderedDict
 import hashlib
 import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Callable
 import re
 import time
 import random
+import zlib
+import bisect
+import heapq
+import mmap
+import struct
+import sys
+import shlex
+import argparse
+import threading
+import contextlib
+import contextvars
+import fnmatch
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import orjson  # Codec JSON rápido opcional
+except ImportError:
+    orjson = None
+
+try:
+    import fcntl  # Bloqueo de archivos en POSIX
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt  # Bloqueo de archivos en Windows
+except ImportError:
+    msvcrt = None
 
 # Configuración del sistema
 DATA_DIR = "data"  # Directorio para almacenar los archivos JSON
 REPOS_FILE = os.path.join(DATA_DIR, "repositories_index.json")  # Índice de repositorios
+MAX_LOADED_REPOSITORIES = None  # Máximo de repositorios cargados en memoria (None: sin límite)
+OBJECTS_DIR = os.path.join(DATA_DIR, "objects")  # Almacén de contenidos por repositorio
+COMPRESS_BLOBS = True  # Comprimir con zlib los contenidos guardados en disco
+DIFF_CACHE_SIZE = 256  # Diffs de archivos guardados en caché por repositorio
+MAX_DELTA_CHAIN = 10  # Máximo de deltas encadenados antes de guardar un contenido completo
+DELTA_CACHE_SIZE = 64  # Contenidos base reconstruidos guardados en caché por almacén
+BLOB_CACHE_SIZE = 256  # Contenidos ya guardados en disco que se mantienen en memoria por almacén
+JOURNAL_MAX_WASTE_RATIO = 0.25  # Fracción de bytes desperdiciados del diario desde la que se compacta al guardar
+JSON_CODEC = "auto"  # "auto": orjson si está instalado; "json": solo la biblioteca estándar
+COMPACT_JSON = True  # Escribir los JSON sin sangría ni espacios (False: legibles con indent=2)
+STREAM_MIN_SIZE = 8 * 1024 * 1024  # Archivos de repositorio desde este tamaño se leen de forma incremental
+STREAM_CHUNK_SIZE = 64 * 1024  # Caracteres leídos por vez en la lectura incremental
+FLUSH_INTERVAL_MS = 50  # Con escritura diferida, espera máxima desde el primer cambio hasta guardarlo
+FLUSH_MAX_OPERATIONS = 100  # Con escritura diferida, cambios que provocan un guardado inmediato
+IO_WORKERS = min(8, os.cpu_count() or 1)  # Hilos para leer o guardar varios repositorios a la vez
+SYNC_WORKERS = 8  # Hilos para forzar a disco varios archivos a la vez (esperan al disco, no a la CPU)
+DECODE_PROCESSES = 0  # Procesos para decodificar snapshots y diarios al cargar varios repositorios (0: en los hilos)
+HASH_CHUNK_SIZE = 1024 * 1024  # Caracteres que se codifican y hashean por vez
+PARALLEL_HASH_MIN_SIZE = 1024 * 1024  # Con menos caracteres en total se hashea en el hilo actual
+
+class JsonCodec:
+    """Codificación JSON con el módulo json de la biblioteca estándar"""
+    name = "json"
+    
+    def __init__(self, compact: bool = COMPACT_JSON):
+        self.compact = compact
+    
+    def dumps(self, data: Any) -> bytes:
+        """Codifica un valor como bytes UTF-8"""
+        if self.compact:
+            return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+        return json.dumps(data, indent=2).encode()
+    
+    def loads(self, data: bytes) -> Any:
+        """Decodifica un documento completo"""
+        return json.loads(data)
+
+class OrjsonCodec(JsonCodec):
+    """Codificación JSON con orjson, compatible con JsonCodec"""
+    name = "orjson"
+    
+    def dumps(self, data: Any) -> bytes:
+        if self.compact:
+            return orjson.dumps(data)
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+def get_codec(name: str = JSON_CODEC, compact: bool = COMPACT_JSON) -> JsonCodec:
+    """Obtiene un codec por nombre; "auto" usa orjson si está instalado"""
+    if name == "orjson" or (name == "auto" and orjson is not None):
+        if orjson is None:
+            raise ValueError("El codec 'orjson' no está instalado.")
+        return OrjsonCodec(compact)
+    if name in ("auto", "json"):
+        return JsonCodec(compact)
+    raise ValueError(f"Codec JSON desconocido: '{name}'.")
+
+# Los registros de una línea (diario, objetos del pack) siempre son compactos
+_RECORD_CODEC = get_codec(compact=True)
+
+class JsonStreamReader:
+    """Lectura incremental de un documento JSON, al estilo de ijson.
+
+    Solo se mantiene en memoria un fragmento del texto: los valores se
+    decodifican de a uno con JSONDecoder.raw_decode y los arreglos elegidos
+    se recorren elemento por elemento.
+    """
+    def __init__(self, f, chunk_size: int = STREAM_CHUNK_SIZE):
+        self._file = f
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+    
+    def _read_more(self) -> bool:
+        """Descarta el texto ya consumido y lee más; los valores grandes duplican la lectura"""
+        if self._eof:
+            return False
+        pending = len(self._buffer) - self._position
+        chunk = self._file.read(max(self._chunk_size, pending))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+        return True
+    
+    def _peek(self) -> str:
+        """Salta los espacios y retorna el siguiente carácter sin consumirlo"""
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in " \t\r\n":
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._read_more():
+                raise ValueError("Fin inesperado del documento JSON.")
+    
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise ValueError(f"Se esperaba '{char}' en el documento JSON.")
+        self._position += 1
+    
+    def _value(self) -> Any:
+        """Decodifica el siguiente valor completo"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+                # Un número al final del fragmento podría seguir en el próximo
+                if end < len(self._buffer) or self._eof:
+                    self._position = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._read_more()
+    
+    def _separator(self, closing: str) -> bool:
+        """Consume una coma o el cierre; retorna True si era el cierre"""
+        char = self._peek()
+        self._position += 1
+        if char == closing:
+            return True
+        if char != ",":
+            raise ValueError(f"Se esperaba ',' o '{closing}' en el documento JSON.")
+        return False
+    
+    def iter_array(self):
+        """Recorre los elementos de un arreglo"""
+        self._expect("[")
+        if self._peek() == "]":
+            self._position += 1
+            return
+        while True:
+            yield self._value()
+            if self._separator("]"):
+                return
+    
+    def iter_object(self, stream_keys=()):
+        """Recorre los pares (clave, valor) de un objeto.
+
+        Los valores de las claves en stream_keys se entregan como iteradores
+        de sus elementos; los que no se recorran se descartan al avanzar.
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            self._position += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key in stream_keys and self._peek() == "[":
+                items = self.iter_array()
+                yield key, items
+                for _ in items:
+                    pass
+            else:
+                yield key, self._value()
+            if self._separator("}"):
+                return
+
+def _write_json_atomic(path: str, data: Any, codec: Optional[JsonCodec] = None):
+    """Escribe un JSON en un archivo temporal y lo renombra sobre el destino.
+
+    Si el proceso se interrumpe a mitad de la escritura, el archivo original
+    queda intacto porque os.replace es atómico.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write((codec or get_codec()).dumps(data))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _sync_path(path: str):
+    """Fuerza a disco un archivo o directorio ya escrito; los directorios
+    que el sistema no deja abrir (Windows) se omiten"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        if os.path.isdir(path):
+            return
+        raise
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _sync_paths(paths: List[str]):
+    """Fuerza a disco varios archivos o directorios ya escritos.
+
+    Solo se sincronizan esos caminos, no todo el sistema de archivos: si
+    son varios, en un pool de hilos (fsync libera el GIL), así las esperas
+    al disco se solapan.
+    """
+    if len(paths) < 2 or SYNC_WORKERS < 2:
+        for path in paths:
+            _sync_path(path)
+        return
+    with ThreadPoolExecutor(min(SYNC_WORKERS, len(paths))) as pool:
+        list(pool.map(_sync_path, paths))
+
+def _parse_timestamp(value) -> float:
+    """Convierte una fecha a marca de tiempo; acepta fechas ISO del formato antiguo"""
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+def _format_date(timestamp: float) -> str:
+    """Muestra una marca de tiempo como fecha ISO (AAAA-MM-DD)"""
+    return datetime.date.fromtimestamp(timestamp).isoformat()
+
+def hash_content(content: str) -> str:
+    """Checksum SHA-1 de un contenido en UTF-8.
+
+    Se codifica por partes de HASH_CHUNK_SIZE caracteres: un contenido
+    grande no se copia entero a bytes. Cortar entre caracteres no cambia
+    el resultado.
+    """
+    sha1 = hashlib.sha1()
+    for start in range(0, len(content), HASH_CHUNK_SIZE):
+        sha1.update(content[start:start + HASH_CHUNK_SIZE].encode())
+    return sha1.hexdigest()
+
+def hash_contents(contents: List[str], workers: int = 1) -> List[str]:
+    """Checksums de varios contenidos, en el mismo orden.
+
+    Si en total son grandes se calculan en un pool de `workers` hilos:
+    hashlib libera el GIL mientras hashea.
+    """
+    if workers <= 1 or len(contents) < 2 or sum(map(len, contents)) < PARALLEL_HASH_MIN_SIZE:
+        return [hash_content(content) for content in contents]
+    with ThreadPoolExecutor(min(workers, len(contents))) as pool:
+        return list(pool.map(hash_content, contents))
 
 class Node:
     """Clase base para nodos en estructuras de datos enlazadas"""
+    __slots__ = ("data", "next")
+    
     def __init__(self, data):
         self.data = data
         self.next = None
@@ -63,9 +332,12 @@ class LinkedList:
         return result
 
 class Stack:
-    """Implementación de pila utilizando lista enlazada"""
+    """Implementación de pila sobre un arreglo dinámico.
+
+    El tope es el final del arreglo, así que push y pop son O(1).
+    """
     def __init__(self):
-        self.items = LinkedList()
+        self.items = []
     
     def push(self, item):
         """Añade un elemento a la pila"""
@@ -75,41 +347,25 @@ class Stack:
         """Elimina y retorna el elemento superior de la pila"""
         if self.is_empty():
             return None
-        
-        if self.items.head == self.items.tail:
-            item = self.items.head.data
-            self.items.head = None
-            self.items.tail = None
-            self.items.size -= 1
-            return item
-        
-        current = self.items.head
-        while current.next != self.items.tail:
-            current = current.next
-        
-        item = self.items.tail.data
-        self.items.tail = current
-        current.next = None
-        self.items.size -= 1
-        return item
+        return self.items.pop()
     
     def peek(self):
         """Retorna el elemento superior sin eliminarlo"""
         if self.is_empty():
             return None
-        return self.items.tail.data
+        return self.items[-1]
     
     def is_empty(self):
         """Verifica si la pila está vacía"""
-        return self.items.is_empty()
+        return not self.items
     
     def size(self):
         """Retorna el tamaño de la pila"""
-        return self.items.get_size()
+        return len(self.items)
     
     def to_list(self):
-        """Convierte la pila a una lista de Python"""
-        return self.items.to_list()
+        """Convierte la pila a una lista de Python (del fondo al tope)"""
+        return list(self.items)
 
 class Queue:
     """Implementación de cola utilizando lista enlazada"""
@@ -156,57 +412,1266 @@ class Queue:
         """Busca un elemento en la cola por un atributo específico"""
         return self.items.find(key, value)
 
+class LRUCache:
+    """Caché de tamaño acotado que descarta el elemento usado hace más tiempo"""
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # Los comandos de consulta la comparten entre hilos
+    
+    def get(self, key, default=None):
+        """Obtiene un elemento y lo marca como el más reciente"""
+        with self._lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+            self.misses += 1
+            return default
+    
+    def put(self, key, value):
+        """Guarda un elemento, descartando el más antiguo si se supera la capacidad"""
+        with self._lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.capacity:
+                self.items.popitem(last=False)
+    
+    def __contains__(self, key) -> bool:
+        return key in self.items
+    
+    def __len__(self) -> int:
+        return len(self.items)
+
+class RWLock:
+    """Candado de lectores/escritor: muchos lectores a la vez o un solo escritor.
+
+    Los escritores en espera tienen prioridad sobre los lectores nuevos para
+    no esperar indefinidamente. El hilo escritor puede volver a tomar el
+    candado (para leer o escribir); un lector no puede pasar a escritor.
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = None  # Hilo que tiene el candado de escritura
+        self._writer_depth = 0
+        self._waiting_writers = 0
+    
+    def acquire_read(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            while self._writer is not None or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+    
+    def release_read(self):
+        with self._condition:
+            if self._writer == threading.get_ident():
+                self._writer_depth -= 1
+                return
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+    
+    def acquire_write(self, blocking: bool = True) -> bool:
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._writer_depth += 1
+                return True
+            if not blocking and (self._writer is not None or self._readers):
+                return False
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._writer_depth = 1
+            return True
+    
+    def release_write(self):
+        with self._condition:
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                self._writer = None
+                self._condition.notify_all()
+    
+    @contextlib.contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+    
+    @contextlib.contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+class FileLock:
+    """Candado exclusivo entre procesos sobre un archivo (fcntl en POSIX,
+    msvcrt en Windows; sin ninguno de los dos solo protege dentro del proceso).
+
+    Es reentrante: los hilos del proceso se turnan y el archivo se
+    desbloquea al salir del último bloque que lo tomó.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+    
+    def acquire(self):
+        self._lock.acquire()
+        if not self._depth:
+            try:
+                self._file = open(self.path, 'a+b')
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+                elif msvcrt is not None:
+                    self._file.seek(0)
+                    while True:
+                        try:
+                            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            continue  # LK_LOCK se rinde tras 10 segundos: seguir esperando
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._lock.release()
+                raise
+        self._depth += 1
+    
+    def release(self):
+        self._depth -= 1
+        if not self._depth:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._file.close()
+            self._file = None
+        self._lock.release()
+    
+    def __enter__(self):
+        self.acquire()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.release()
+
+class WriteBehindFlusher:
+    """Hilo que guarda en segundo plano los cambios de los comandos.
+
+    Los comandos solo avisan con notify() y vuelven enseguida. El hilo
+    espera hasta `interval` segundos desde el primer aviso pendiente, o
+    hasta juntar `max_operations` avisos, y guarda todo de una vez: muchos
+    cambios comparten así las mismas escrituras y fsync.
+    """
+    def __init__(self, save, interval: float, max_operations: int):
+        self._save = save
+        self.interval = interval
+        self.max_operations = max_operations
+        self.flushes = 0  # Guardados hechos por el hilo
+        self.last_error = None  # Último error al guardar (se reintenta en el siguiente)
+        self._pending = 0  # Avisos desde el último guardado
+        self._stopping = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def notify(self):
+        """Anota un cambio pendiente de guardar"""
+        with self._condition:
+            self._pending += 1
+            if self._pending == 1 or self._pending >= self.max_operations:
+                self._condition.notify()
+    
+    def stop(self):
+        """Guarda lo pendiente y termina el hilo"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self._thread.join()
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._stopping)
+                self._condition.wait_for(
+                    lambda: self._pending >= self.max_operations or self._stopping, self.interval)
+                stopping = self._stopping
+                self._pending = 0
+            try:
+                self._save()
+                self.flushes += 1
+            except Exception as e:
+                self.last_error = e
+                print(f"Error al guardar en segundo plano: {e}", file=sys.stderr)
+                with self._condition:
+                    self._pending += 1  # Reintentar en el siguiente ciclo
+            if stopping:
+                return
+
+def _middle_snake(a: List[int], a_lo: int, a_hi: int, b: List[int], b_lo: int, b_hi: int):
+    """Busca la serpiente central del camino de edición mínimo (Myers, 1986).
+
+    Retorna (x, y, u, v): la diagonal de coincidencias que va de (x, y) a
+    (u, v) en coordenadas relativas al subproblema. Usa O(N + M) memoria.
+    """
+    n = a_hi - a_lo
+    m = b_hi - b_lo
+    delta = n - m
+    odd = delta % 2 == 1
+    offset = n + m + 1
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+    
+    for d in range((n + m + 1) // 2 + 1):
+        # Avance desde el inicio
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            if odd and -(d - 1) <= delta - k <= d - 1 and x + backward[offset + delta - k] >= n:
+                return start_x, start_y, x, y
+        
+        # Avance desde el final
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[a_hi - 1 - x] == b[b_hi - 1 - y]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            if not odd and -d <= delta - k <= d and x + forward[offset + delta - k] >= n:
+                return n - x, m - y, n - start_x, m - start_y
+    return 0, 0, 0, 0
+
+def diff_lines(a: List[str], b: List[str]) -> List[tuple]:
+    """Calcula los bloques de líneas iguales entre dos listas con el algoritmo
+    de Myers en espacio lineal.
+
+    Retorna tuplas (i, j, n) ordenadas: a[i:i+n] == b[j:j+n]. El resto de
+    las líneas son borrados de `a` o inserciones de `b`.
+    """
+    # Comparar enteros es más rápido que comparar cadenas
+    line_ids = {}
+    a_ids = [line_ids.setdefault(line, len(line_ids)) for line in a]
+    b_ids = [line_ids.setdefault(line, len(line_ids)) for line in b]
+    
+    matches = []
+    pending = [(0, len(a), 0, len(b))]
+    while pending:
+        a_lo, a_hi, b_lo, b_hi = pending.pop()
+        # Prefijo y sufijo comunes
+        start = 0
+        while a_lo + start < a_hi and b_lo + start < b_hi and a_ids[a_lo + start] == b_ids[b_lo + start]:
+            start += 1
+        if start:
+            matches.append((a_lo, b_lo, start))
+            a_lo += start
+            b_lo += start
+        end = 0
+        while a_lo < a_hi - end and b_lo < b_hi - end and a_ids[a_hi - 1 - end] == b_ids[b_hi - 1 - end]:
+            end += 1
+        if end:
+            matches.append((a_hi - end, b_hi - end, end))
+            a_hi -= end
+            b_hi -= end
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+        
+        x, y, u, v = _middle_snake(a_ids, a_lo, a_hi, b_ids, b_lo, b_hi)
+        if u > x:
+            matches.append((a_lo + x, b_lo + y, u - x))
+        pending.append((a_lo, a_lo + x, b_lo, b_lo + y))
+        pending.append((a_lo + u, a_hi, b_lo + v, b_hi))
+    
+    # Ordenar y unir bloques contiguos
+    matches.sort()
+    merged = []
+    for i, j, n in matches:
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + n)
+        else:
+            merged.append((i, j, n))
+    return merged
+
+def merge_lines(base: List[str], ours: List[str], theirs: List[str],
+                ours_label: str = "ours", theirs_label: str = "theirs"):
+    """Fusiona a tres vías dos versiones de un texto a partir de su base común.
+
+    Retorna (líneas, conflictos). Los conflictos quedan marcados en el texto
+    con <<<<<<< / ======= / >>>>>>> y se describen como diccionarios con la
+    línea de la base donde empiezan.
+    """
+    ours_matches = diff_lines(base, ours)
+    theirs_matches = diff_lines(base, theirs)
+    
+    # Regiones estables: líneas de la base que no cambiaron en ninguna versión
+    regions = []
+    i = j = 0
+    while i < len(ours_matches) and j < len(theirs_matches):
+        o_base, o_pos, o_len = ours_matches[i]
+        t_base, t_pos, t_len = theirs_matches[j]
+        start = max(o_base, t_base)
+        end = min(o_base + o_len, t_base + t_len)
+        if start < end:
+            regions.append((start, end, o_pos + start - o_base, t_pos + start - t_base))
+        if o_base + o_len < t_base + t_len:
+            i += 1
+        else:
+            j += 1
+    regions.append((len(base), len(base), len(ours), len(theirs)))
+    
+    result = []
+    conflicts = []
+    base_pos = ours_pos = theirs_pos = 0
+    for start, end, ours_start, theirs_start in regions:
+        base_chunk = base[base_pos:start]
+        ours_chunk = ours[ours_pos:ours_start]
+        theirs_chunk = theirs[theirs_pos:theirs_start]
+        if ours_chunk == theirs_chunk or theirs_chunk == base_chunk:
+            result.extend(ours_chunk)
+        elif ours_chunk == base_chunk:
+            result.extend(theirs_chunk)
+        else:
+            conflicts.append({"base_line": base_pos + 1,
+                              "ours_lines": len(ours_chunk),
+                              "theirs_lines": len(theirs_chunk)})
+            result.append(f"<<<<<<< {ours_label}\n")
+            result.extend(_ensure_newline(ours_chunk))
+            result.append("=======\n")
+            result.extend(_ensure_newline(theirs_chunk))
+            result.append(f">>>>>>> {theirs_label}\n")
+        result.extend(base[start:end])
+        base_pos = end
+        ours_pos = ours_start + (end - start)
+        theirs_pos = theirs_start + (end - start)
+    return result, conflicts
+
+def unified_diff(a: List[str], b: List[str], context: int = 3) -> List[str]:
+    """Genera las líneas de un diff unificado (@@ -a,n +b,m @@) entre dos textos"""
+    # Convertir los bloques iguales en operaciones (tipo, i1, i2, j1, j2)
+    ops = []
+    i = j = 0
+    for match_i, match_j, length in diff_lines(a, b) + [(len(a), len(b), 0)]:
+        if i < match_i or j < match_j:
+            ops.append(("change", i, match_i, j, match_j))
+        if length:
+            ops.append(("equal", match_i, match_i + length, match_j, match_j + length))
+        i, j = match_i + length, match_j + length
+    
+    # Agrupar cambios separados por pocas líneas iguales en un mismo bloque
+    groups = []
+    for index, op in enumerate(ops):
+        if op[0] != "change":
+            continue
+        if groups and index - groups[-1][-1] == 2 and ops[index - 1][2] - ops[index - 1][1] <= 2 * context:
+            groups[-1].append(index)
+        else:
+            groups.append([index])
+    
+    lines = []
+    for group in groups:
+        first, last = ops[group[0]], ops[group[-1]]
+        before = ops[group[0] - 1] if group[0] > 0 else None
+        after = ops[group[-1] + 1] if group[-1] + 1 < len(ops) else None
+        context_before = min(context, before[2] - before[1]) if before else 0
+        context_after = min(context, after[2] - after[1]) if after else 0
+        a_start, b_start = first[1] - context_before, first[3] - context_before
+        a_end, b_end = last[2] + context_after, last[4] + context_after
+        # Por convención un rango vacío se numera desde la línea anterior
+        a_range = f"{a_start + 1 if a_end > a_start else a_start},{a_end - a_start}"
+        b_range = f"{b_start + 1 if b_end > b_start else b_start},{b_end - b_start}"
+        lines.append(f"@@ -{a_range} +{b_range} @@")
+        
+        lines.extend(" " + line.rstrip("\n") for line in a[a_start:first[1]])
+        for index in range(group[0], group[-1] + 1):
+            tag, i1, i2, j1, j2 = ops[index]
+            if tag == "equal":
+                lines.extend(" " + line.rstrip("\n") for line in a[i1:i2])
+            else:
+                lines.extend("-" + line.rstrip("\n") for line in a[i1:i2])
+                lines.extend("+" + line.rstrip("\n") for line in b[j1:j2])
+        lines.extend(" " + line.rstrip("\n") for line in a[last[2]:a_end])
+    return lines
+
+def _ensure_newline(lines: List[str]) -> List[str]:
+    """Agrega un salto de línea a la última línea para que no se pegue al marcador"""
+    if lines and not lines[-1].endswith("\n"):
+        return lines[:-1] + [lines[-1] + "\n"]
+    return lines
+
+class _HamtNode:
+    """Nodo interno del trie: un bitmap de 32 posiciones y sus entradas.
+
+    Cada entrada es una tupla (clave, valor) o un nodo hijo.
+    """
+    __slots__ = ("bitmap", "entries")
+    
+    def __init__(self, bitmap: int, entries: list):
+        self.bitmap = bitmap
+        self.entries = entries
+
+class _CollisionNode:
+    """Nodo para claves cuyo hash completo coincide"""
+    __slots__ = ("entries",)
+    
+    def __init__(self, entries: list):
+        self.entries = entries
+
+_HAMT_BITS = 5  # Bits del hash consumidos por nivel (32 hijos por nodo)
+_HAMT_MAX_SHIFT = 64  # Con más bits que estos se usan nodos de colisión
+
+def _hamt_hash(key) -> int:
+    return hash(key) & 0xFFFFFFFFFFFFFFFF
+
+def _hamt_pair(first: tuple, first_hash: int, second: tuple, second_hash: int, shift: int):
+    """Crea el subárbol mínimo que contiene dos entradas"""
+    if shift >= _HAMT_MAX_SHIFT:
+        return _CollisionNode([first, second])
+    first_bit = (first_hash >> shift) & 31
+    second_bit = (second_hash >> shift) & 31
+    if first_bit == second_bit:
+        child = _hamt_pair(first, first_hash, second, second_hash, shift + _HAMT_BITS)
+        return _HamtNode(1 << first_bit, [child])
+    entries = [first, second] if first_bit < second_bit else [second, first]
+    return _HamtNode((1 << first_bit) | (1 << second_bit), entries)
+
+def _hamt_set(node, key, value, key_hash: int, shift: int):
+    """Retorna (nodo nuevo, si se agregó una clave) sin modificar el original"""
+    if isinstance(node, _CollisionNode):
+        entries = [entry for entry in node.entries if entry[0] != key]
+        added = len(entries) == len(node.entries)
+        return _CollisionNode(entries + [(key, value)]), added
+    
+    bit = 1 << ((key_hash >> shift) & 31)
+    index = (node.bitmap & (bit - 1)).bit_count()
+    if not node.bitmap & bit:
+        entries = node.entries[:index] + [(key, value)] + node.entries[index:]
+        return _HamtNode(node.bitmap | bit, entries), True
+    
+    entry = node.entries[index]
+    if isinstance(entry, tuple):
+        if entry[0] == key:
+            if entry[1] == value:
+                return node, False
+            new_entry, added = (key, value), False
+        else:
+            new_entry = _hamt_pair(entry, _hamt_hash(entry[0]), (key, value), key_hash, shift + _HAMT_BITS)
+            added = True
+    else:
+        new_entry, added = _hamt_set(entry, key, value, key_hash, shift + _HAMT_BITS)
+        if new_entry is entry:
+            return node, False
+    entries = list(node.entries)
+    entries[index] = new_entry
+    return _HamtNode(node.bitmap, entries), added
+
+def _hamt_delete(node, key, key_hash: int, shift: int):
+    """Retorna el nodo sin la clave (None si queda vacío); el mismo nodo si no estaba"""
+    if isinstance(node, _CollisionNode):
+        entries = [entry for entry in node.entries if entry[0] != key]
+        if len(entries) == len(node.entries):
+            return node
+        return _CollisionNode(entries) if entries else None
+    
+    bit = 1 << ((key_hash >> shift) & 31)
+    if not node.bitmap & bit:
+        return node
+    index = (node.bitmap & (bit - 1)).bit_count()
+    entry = node.entries[index]
+    if isinstance(entry, tuple):
+        if entry[0] != key:
+            return node
+        new_entry = None
+    else:
+        new_entry = _hamt_delete(entry, key, key_hash, shift + _HAMT_BITS)
+        if new_entry is entry:
+            return node
+        # Un hijo con una sola clave se reemplaza por la propia clave
+        if new_entry is not None and len(new_entry.entries) == 1 and isinstance(new_entry.entries[0], tuple):
+            new_entry = new_entry.entries[0]
+    
+    entries = list(node.entries)
+    if new_entry is None:
+        del entries[index]
+        return _HamtNode(node.bitmap & ~bit, entries) if entries else None
+    entries[index] = new_entry
+    return _HamtNode(node.bitmap, entries)
+
+def _hamt_items(node):
+    """Recorre todas las entradas de un subárbol"""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        for entry in current.entries:
+            if isinstance(entry, tuple):
+                yield entry
+            else:
+                stack.append(entry)
+
+class PersistentMap:
+    """Diccionario inmutable implementado como trie de hash (HAMT).
+
+    Cada modificación devuelve un mapa nuevo que comparte con el anterior
+    todos los nodos que no cambiaron, así que cuesta O(log n) memoria y
+    guardar muchas versiones casi iguales es barato.
+    """
+    __slots__ = ("_root", "_size")
+    
+    def __init__(self, root=None, size: int = 0):
+        self._root = root
+        self._size = size
+    
+    def get(self, key, default=None):
+        """Obtiene el valor de una clave"""
+        node = self._root
+        key_hash = _hamt_hash(key)
+        shift = 0
+        while node is not None:
+            if isinstance(node, _CollisionNode):
+                for entry_key, value in node.entries:
+                    if entry_key == key:
+                        return value
+                return default
+            bit = 1 << ((key_hash >> shift) & 31)
+            if not node.bitmap & bit:
+                return default
+            entry = node.entries[(node.bitmap & (bit - 1)).bit_count()]
+            if isinstance(entry, tuple):
+                return entry[1] if entry[0] == key else default
+            node = entry
+            shift += _HAMT_BITS
+        return default
+    
+    def __getitem__(self, key):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            raise KeyError(key)
+        return value
+    
+    def __contains__(self, key) -> bool:
+        missing = object()
+        return self.get(key, missing) is not missing
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __iter__(self):
+        return (key for key, _ in self.items())
+    
+    def items(self):
+        """Recorre los pares (clave, valor) en un orden arbitrario"""
+        if self._root is None:
+            return iter(())
+        return _hamt_items(self._root)
+    
+    def set(self, key, value) -> 'PersistentMap':
+        """Retorna un mapa nuevo con la clave asignada"""
+        key_hash = _hamt_hash(key)
+        if self._root is None:
+            return PersistentMap(_HamtNode(1 << (key_hash & 31), [(key, value)]), 1)
+        root, added = _hamt_set(self._root, key, value, key_hash, 0)
+        if root is self._root:
+            return self
+        return PersistentMap(root, self._size + (1 if added else 0))
+    
+    def delete(self, key) -> 'PersistentMap':
+        """Retorna un mapa nuevo sin la clave"""
+        if self._root is None or key not in self:
+            return self
+        return PersistentMap(_hamt_delete(self._root, key, _hamt_hash(key), 0), self._size - 1)
+    
+    def diff(self, other: 'PersistentMap'):
+        """Recorre las claves con distinto valor en ambos mapas como tuplas
+        (clave, valor aquí, valor en el otro); usa None si falta la clave.
+
+        Los subárboles compartidos se saltan sin recorrerlos, así que el
+        costo depende de cuántas claves cambiaron.
+        """
+        pending = [(self._root, other._root)]
+        while pending:
+            mine, theirs = pending.pop()
+            if mine is theirs:
+                continue
+            if isinstance(mine, _HamtNode) and isinstance(theirs, _HamtNode):
+                bitmap = mine.bitmap | theirs.bitmap
+                while bitmap:
+                    bit = bitmap & -bitmap
+                    bitmap ^= bit
+                    mine_entry = mine.entries[(mine.bitmap & (bit - 1)).bit_count()] \
+                        if mine.bitmap & bit else None
+                    theirs_entry = theirs.entries[(theirs.bitmap & (bit - 1)).bit_count()] \
+                        if theirs.bitmap & bit else None
+                    if isinstance(mine_entry, tuple) or isinstance(theirs_entry, tuple) \
+                            or mine_entry is None or theirs_entry is None:
+                        yield from _diff_entries(mine_entry, theirs_entry)
+                    else:
+                        pending.append((mine_entry, theirs_entry))
+            else:
+                yield from _diff_entries(mine, theirs)
+
+def _diff_entries(mine, theirs):
+    """Compara dos entradas cualesquiera (tupla, nodo o ausente) por contenido"""
+    if mine is theirs:
+        return
+    mine_items = dict(_entry_items(mine))
+    theirs_items = dict(_entry_items(theirs))
+    for key, value in mine_items.items():
+        other_value = theirs_items.get(key)
+        if other_value != value:
+            yield key, value, other_value
+    for key, value in theirs_items.items():
+        if key not in mine_items:
+            yield key, None, value
+
+def _entry_items(entry):
+    if entry is None:
+        return []
+    if isinstance(entry, tuple):
+        return [entry]
+    return _hamt_items(entry)
+
+PACK_COMMIT = 1  # Tipo de objeto en el packfile: commit (JSON comprimido)
+PACK_BLOB = 2  # Tipo de objeto en el packfile: contenido de archivo comprimido
+PACK_DELTA = 3  # Tipo de objeto en el packfile: checksum del contenido base + delta
+_PACK_HEADER = struct.Struct(">4sII")  # Firma, versión y cantidad de objetos
+_PACK_OBJECT = struct.Struct(">BI")  # Tipo y largo de los datos de cada objeto
+_PACK_ID_SIZE = 40  # Los IDs se guardan en el índice con ancho fijo
+
+def write_pack(pack_path: str, index_path: str, objects, before_replace=None):
+    """Escribe un packfile y su índice a partir de tuplas (id, tipo, datos comprimidos).
+
+    El pack contiene los objetos uno detrás de otro; el índice tiene una
+    tabla fan-out de 256 entradas por primer byte del ID, los IDs ordenados
+    con ancho fijo y el desplazamiento de cada objeto dentro del pack.
+    `before_replace` se llama con todo escrito, justo antes de reemplazar
+    los archivos anteriores (p. ej. para cerrar un PackReader que los lee).
+    """
+    offsets = {}
+    tmp_pack = f"{pack_path}.tmp"
+    with open(tmp_pack, 'wb') as f:
+        f.write(_PACK_HEADER.pack(b"PACK", 1, 0))
+        for object_id, object_type, data in objects:
+            if object_id in offsets:
+                continue
+            offsets[object_id] = f.tell()
+            f.write(_PACK_OBJECT.pack(object_type, len(data)))
+            f.write(data)
+        # La cantidad se conoce al final
+        f.seek(0)
+        f.write(_PACK_HEADER.pack(b"PACK", 1, len(offsets)))
+        f.flush()
+        os.fsync(f.fileno())
+    
+    ids = sorted(offsets)
+    fanout = [0] * 256
+    for object_id in ids:
+        fanout[object_id.encode()[0]] += 1
+    for i in range(1, 256):
+        fanout[i] += fanout[i - 1]
+    
+    tmp_index = f"{index_path}.tmp"
+    with open(tmp_index, 'wb') as f:
+        f.write(_PACK_HEADER.pack(b"PIDX", 1, len(ids)))
+        f.write(struct.pack(">256I", *fanout))
+        for object_id in ids:
+            f.write(object_id.encode().ljust(_PACK_ID_SIZE, b"\0"))
+        for object_id in ids:
+            f.write(struct.pack(">Q", offsets[object_id]))
+        f.flush()
+        os.fsync(f.fileno())
+    
+    if before_replace is not None:
+        before_replace()
+    os.replace(tmp_pack, pack_path)
+    os.replace(tmp_index, index_path)
+
+class PackReader:
+    """Lectura de un packfile mediante mmap.
+
+    Buscar un objeto es una búsqueda binaria dentro del rango que indica la
+    tabla fan-out del índice; solo se descomprime el objeto pedido.
+    """
+    def __init__(self, pack_path: str, index_path: str):
+        self.pack_path = pack_path
+        self.index_path = index_path
+        with open(pack_path, 'rb') as f:
+            self._pack = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(index_path, 'rb') as f:
+            self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, _, self.count = _PACK_HEADER.unpack_from(self._index, 0)
+        if magic != b"PIDX":
+            raise ValueError(f"Índice de pack inválido: {index_path}")
+        self._fanout = struct.unpack_from(">256I", self._index, _PACK_HEADER.size)
+        self._ids_start = _PACK_HEADER.size + 256 * 4
+        self._offsets_start = self._ids_start + self.count * _PACK_ID_SIZE
+    
+    def _id_at(self, position: int) -> str:
+        start = self._ids_start + position * _PACK_ID_SIZE
+        return self._index[start:start + _PACK_ID_SIZE].rstrip(b"\0").decode()
+    
+    def _range(self, first_char: str):
+        """Rango de posiciones de los IDs que empiezan por un carácter"""
+        byte = first_char.encode()[0]
+        return (self._fanout[byte - 1] if byte else 0), self._fanout[byte]
+    
+    def _position(self, object_id: str) -> int:
+        """Posición de un ID en el índice, o -1 si no está"""
+        if not object_id:
+            return -1
+        lo, hi = self._range(object_id[0])
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_id = self._id_at(mid)
+            if mid_id < object_id:
+                lo = mid + 1
+            elif mid_id > object_id:
+                hi = mid
+            else:
+                return mid
+        return -1
+    
+    def __contains__(self, object_id: str) -> bool:
+        return self._position(object_id) >= 0
+    
+    def read_raw(self, object_id: str):
+        """Obtiene (tipo, datos comprimidos) de un objeto, o None si no está"""
+        position = self._position(object_id)
+        if position < 0:
+            return None
+        offset, = struct.unpack_from(">Q", self._index, self._offsets_start + position * 8)
+        object_type, length = _PACK_OBJECT.unpack_from(self._pack, offset)
+        start = offset + _PACK_OBJECT.size
+        return object_type, self._pack[start:start + length]
+    
+    def get(self, object_id: str):
+        """Obtiene (tipo, datos) de un objeto ya descomprimido, o None si no está"""
+        raw = self.read_raw(object_id)
+        if raw is None:
+            return None
+        return raw[0], zlib.decompress(raw[1])
+    
+    def find_prefix(self, prefix: str, limit: int = 2) -> List[str]:
+        """Obtiene hasta `limit` IDs que empiezan por el prefijo dado"""
+        if not prefix:
+            return []
+        lo, hi = self._range(prefix[0])
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._id_at(mid) < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        matches = []
+        while lo < self.count and len(matches) < limit and self._id_at(lo).startswith(prefix):
+            matches.append(self._id_at(lo))
+            lo += 1
+        return matches
+    
+    def iter_raw(self):
+        """Recorre todos los objetos como (id, tipo, datos comprimidos)"""
+        for position in range(self.count):
+            object_id = self._id_at(position)
+            object_type, data = self.read_raw(object_id)
+            yield object_id, object_type, data
+    
+    def ids(self, *object_types: int) -> List[str]:
+        """Lista los IDs del pack, opcionalmente solo los de ciertos tipos"""
+        result = []
+        for position in range(self.count):
+            object_id = self._id_at(position)
+            if not object_types or self.read_raw(object_id)[0] in object_types:
+                result.append(object_id)
+        return result
+    
+    def close(self):
+        """Libera los mapeos de memoria"""
+        self._pack.close()
+        self._index.close()
+
+_DELTA_BLOCK = 16  # Tamaño de los bloques del contenido base que se indexan para buscar copias
+
+def _write_varint(out: bytearray, value: int):
+    """Escribe un entero no negativo usando 7 bits por byte"""
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data: bytes, position: int):
+    """Lee un entero escrito con _write_varint; retorna (valor, nueva posición)"""
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, position
+
+def _delta_insert(out: bytearray, data: bytes):
+    """Escribe una instrucción de inserción con los bytes literales"""
+    if data:
+        _write_varint(out, len(data) << 1)
+        out += data
+
+def make_delta(base: bytes, target: bytes) -> bytes:
+    """Codifica target como instrucciones de copia (desde base) e inserción.
+
+    Como rsync/xdelta, se indexan los bloques de base y se busca cada
+    posición de target en el índice; cada coincidencia se extiende hacia
+    atrás y hacia adelante. El tamaño del delta depende de lo que cambió,
+    no del tamaño del contenido.
+    """
+    out = bytearray()
+    _write_varint(out, len(base))
+    _write_varint(out, len(target))
+    
+    blocks = {}
+    for offset in range(0, len(base) - _DELTA_BLOCK + 1, _DELTA_BLOCK):
+        blocks.setdefault(base[offset:offset + _DELTA_BLOCK], offset)
+    
+    pending = 0  # Inicio de los bytes de target aún no emitidos
+    position = 0
+    while position + _DELTA_BLOCK <= len(target):
+        offset = blocks.get(target[position:position + _DELTA_BLOCK])
+        if offset is None:
+            position += 1
+            continue
+        
+        start = position
+        while start > pending and offset > 0 and base[offset - 1] == target[start - 1]:
+            start -= 1
+            offset -= 1
+        length = position - start + _DELTA_BLOCK
+        while (start + length + _DELTA_BLOCK <= len(target)
+               and base[offset + length:offset + length + _DELTA_BLOCK]
+               == target[start + length:start + length + _DELTA_BLOCK]):
+            length += _DELTA_BLOCK
+        while (start + length < len(target) and offset + length < len(base)
+               and base[offset + length] == target[start + length]):
+            length += 1
+        
+        _delta_insert(out, target[pending:start])
+        _write_varint(out, length << 1 | 1)
+        _write_varint(out, offset)
+        position = pending = start + length
+    
+    _delta_insert(out, target[pending:])
+    return bytes(out)
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """Reconstruye el contenido codificado por make_delta a partir de su base"""
+    base_size, position = _read_varint(delta, 0)
+    target_size, position = _read_varint(delta, position)
+    if base_size != len(base):
+        raise ValueError("El delta no corresponde al contenido base.")
+    
+    out = bytearray()
+    while position < len(delta):
+        value, position = _read_varint(delta, position)
+        length = value >> 1
+        if value & 1:
+            offset, position = _read_varint(delta, position)
+            out += base[offset:offset + length]
+        else:
+            out += delta[position:position + length]
+            position += length
+    
+    if len(out) != target_size:
+        raise ValueError("El delta está incompleto.")
+    return bytes(out)
+
+class BlobStore:
+    """Almacén de contenidos direccionado por checksum.
+
+    Cada contenido distinto se guarda una sola vez en disco
+    (data/objects/<repo>/<2 caracteres>/<resto del checksum>), y los commits
+    solo guardan el checksum. En memoria quedan los contenidos aún sin
+    guardar y, en una caché acotada, los últimos leídos. Una nueva versión de un archivo se guarda como
+    delta respecto de la anterior si así ocupa menos, con cadenas de deltas
+    de a lo sumo MAX_DELTA_CHAIN eslabones.
+    """
+    def __init__(self, directory: Optional[str] = None, compress: bool = COMPRESS_BLOBS):
+        self.directory = directory  # None: almacén solo en memoria
+        self.compress = compress
+        self._blobs = LRUCache(BLOB_CACHE_SIZE)  # checksum -> contenido ya guardado en disco
+        self._pinned = {}  # checksum -> contenido que no se puede volver a leer de disco
+        self._unsaved = set()  # Checksums aún no escritos en disco
+        self.pack = None  # PackReader con contenidos empaquetados
+        self._bases = {}  # Checksum sin guardar -> checksum de la versión anterior
+        self._depths = {}  # Checksum -> largo de su cadena de deltas
+        self.delta_cache = LRUCache(DELTA_CACHE_SIZE)  # Checksum -> bytes reconstruidos
+    
+    def _blob_path(self, checksum: str) -> str:
+        """Obtiene la ruta en disco de un contenido"""
+        return os.path.join(self.directory, checksum[:2], checksum[2:])
+    
+    def put(self, content: str, checksum: Optional[str] = None, base: Optional[str] = None) -> str:
+        """Guarda un contenido y retorna su checksum.
+
+        base es el checksum de la versión anterior del mismo archivo; al
+        escribirlo en disco se intentará guardarlo como delta respecto de ella.
+        """
+        if checksum is None:
+            checksum = hash_content(content)
+        if self._cached(checksum) is None:
+            if self.directory and self._on_disk(checksum):
+                self._blobs.put(checksum, content)
+            else:
+                # Sin guardar (o almacén solo en memoria): no puede salir de memoria
+                self._pinned[checksum] = content
+                if self.directory:
+                    self._unsaved.add(checksum)
+                    if base is not None and base != checksum:
+                        self._bases[checksum] = base
+        return checksum
+    
+    def _cached(self, checksum: str) -> Optional[str]:
+        """Obtiene un contenido que está en memoria, o None"""
+        content = self._pinned.get(checksum)
+        return content if content is not None else self._blobs.get(checksum)
+    
+    def _on_disk(self, checksum: str) -> bool:
+        """Indica si un contenido ya está guardado, suelto o empaquetado"""
+        return (self.pack is not None and checksum in self.pack) or \
+            bool(self.directory and os.path.exists(self._blob_path(checksum)))
+    
+    def intern(self, file: 'File', base: Optional[str] = None):
+        """Guarda el contenido de un archivo y lo comparte con otras copias idénticas"""
+        content = file.content
+        checksum = self.put(content, file.checksum, base)
+        cached = self._cached(checksum)
+        file.content = cached if cached is not None else content
+        file.blobs = self
+    
+    def get(self, checksum: str) -> str:
+        """Obtiene un contenido por su checksum, leyéndolo de disco si hace falta"""
+        content = self._cached(checksum)
+        if content is None:
+            content = self._load(checksum).decode()
+            self._blobs.put(checksum, content)
+        return content
+    
+    def read_raw(self, checksum: str):
+        """Obtiene un contenido tal como está guardado: (PACK_BLOB, bytes) o
+        (PACK_DELTA, checksum base + delta); None si no existe"""
+        packed = self.pack.get(checksum) if self.pack is not None else None
+        if packed is not None:
+            return packed
+        if self.directory and os.path.exists(self._blob_path(checksum)):
+            with open(self._blob_path(checksum), 'rb') as f:
+                data = f.read()
+            # El primer byte indica el formato: comprimido, delta o sin comprimir
+            if data[:1] == b"z":
+                return PACK_BLOB, zlib.decompress(data[1:])
+            if data[:1] == b"d":
+                return PACK_DELTA, zlib.decompress(data[1:])
+            return PACK_BLOB, data[1:]
+        content = self._cached(checksum)
+        if content is not None:
+            return PACK_BLOB, content.encode()
+        return None
+    
+    def _load(self, checksum: str) -> bytes:
+        """Reconstruye un contenido siguiendo su cadena de deltas hasta una base conocida"""
+        chain = []
+        while True:
+            content = self._cached(checksum)
+            if content is not None:
+                data = content.encode()
+                break
+            data = self.delta_cache.get(checksum)
+            if data is not None:
+                break
+            raw = self.read_raw(checksum)
+            if raw is None:
+                raise KeyError(f"El contenido '{checksum}' no existe.")
+            object_type, data = raw
+            if object_type != PACK_DELTA:
+                if chain:
+                    self.delta_cache.put(checksum, data)
+                break
+            chain.append((checksum, data[_PACK_ID_SIZE:]))
+            checksum = data[:_PACK_ID_SIZE].decode()
+        
+        for checksum, delta in reversed(chain):
+            data = apply_delta(data, delta)
+            self.delta_cache.put(checksum, data)
+        return data
+    
+    def _delta_depth(self, checksum: str) -> int:
+        """Obtiene cuántos deltas hay que aplicar para reconstruir un contenido"""
+        chain = []
+        while checksum not in self._depths:
+            raw = self.read_raw(checksum)
+            if raw is None or raw[0] != PACK_DELTA:
+                self._depths[checksum] = 0
+                break
+            chain.append(checksum)
+            checksum = raw[1][:_PACK_ID_SIZE].decode()
+        
+        depth = self._depths[checksum]
+        for checksum in reversed(chain):
+            depth += 1
+            self._depths[checksum] = depth
+        return depth
+    
+    def __contains__(self, checksum: str) -> bool:
+        return checksum in self._pinned or checksum in self._blobs or self._on_disk(checksum)
+    
+    def checksums(self) -> List[str]:
+        """Lista los checksums de todos los contenidos: en memoria, sueltos y empaquetados"""
+        result = dict.fromkeys(self._pinned)
+        if self.directory and os.path.isdir(self.directory):
+            for prefix in os.listdir(self.directory):
+                prefix_dir = os.path.join(self.directory, prefix)
+                for rest in os.listdir(prefix_dir):
+                    if not rest.endswith(".tmp"):
+                        result[prefix + rest] = None
+        if self.pack is not None:
+            result.update(dict.fromkeys(self.pack.ids(PACK_BLOB, PACK_DELTA)))
+        return list(result)
+    
+    def prune_loose(self):
+        """Borra los archivos sueltos de los contenidos que ya están empaquetados"""
+        if self.pack is None or not self.directory or not os.path.isdir(self.directory):
+            return
+        for prefix in os.listdir(self.directory):
+            prefix_dir = os.path.join(self.directory, prefix)
+            for rest in os.listdir(prefix_dir):
+                if prefix + rest in self.pack:
+                    os.remove(os.path.join(prefix_dir, rest))
+            if not os.listdir(prefix_dir):
+                os.rmdir(prefix_dir)
+    
+    def flush(self):
+        """Escribe en disco los contenidos nuevos; los existentes nunca se reescriben"""
+        objects = []
+        encoded = set()
+        for checksum in list(self._unsaved):
+            # Las versiones anteriores sin guardar se codifican primero para
+            # conocer el largo de su cadena de deltas
+            pending = []
+            while checksum in self._unsaved and checksum not in encoded and checksum not in pending:
+                pending.append(checksum)
+                checksum = self._bases.get(checksum)
+            for checksum in reversed(pending):
+                objects.append((checksum, self._encode(checksum)))
+                encoded.add(checksum)
+        
+        self._write_loose(objects)
+        for checksum, _ in objects:
+            self._unsaved.discard(checksum)
+            self._bases.pop(checksum, None)
+            # Ya se puede volver a leer: pasa a la caché acotada
+            self._blobs.put(checksum, self._pinned.pop(checksum))
+    
+    def _encode(self, checksum: str) -> bytes:
+        """Codifica un contenido para el disco, como delta si ocupa menos"""
+        content = self._pinned[checksum].encode()
+        data = b"z" + zlib.compress(content) if self.compress else b"r" + content
+        
+        base = self._bases.get(checksum)
+        if base is not None and base in self and self._delta_depth(base) < MAX_DELTA_CHAIN:
+            delta = make_delta(self._load(base), content)
+            delta_data = b"d" + zlib.compress(base.encode() + delta)
+            if len(delta_data) < len(data):
+                self._depths[checksum] = self._delta_depth(base) + 1
+                return delta_data
+        self._depths[checksum] = 0
+        return data
+    
+    def _write_loose(self, objects: List[tuple]):
+        """Escribe contenidos ya codificados (checksum, datos) como archivos
+        sueltos de forma atómica.
+
+        Primero se escriben todos en temporales y se sincronizan juntos;
+        después se renombran y se sincronizan sus directorios. Muchos
+        contenidos nuevos no cuestan un fsync por archivo.
+        """
+        renames = []
+        for checksum, data in objects:
+            path = self._blob_path(checksum)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            renames.append((tmp_path, path))
+        if not renames:
+            return
+        
+        _sync_paths([tmp_path for tmp_path, _ in renames])
+        for tmp_path, path in renames:
+            os.replace(tmp_path, path)
+        _sync_paths(sorted({os.path.dirname(path) for _, path in renames}))
+    
+    def unpack(self):
+        """Escribe como archivos sueltos los contenidos empaquetados y deja de usar el pack"""
+        if self.pack is None:
+            return
+        objects = []
+        for checksum in self.pack.ids(PACK_BLOB, PACK_DELTA):
+            if not os.path.exists(self._blob_path(checksum)):
+                object_type, data = self.pack.get(checksum)
+                objects.append((checksum, (b"d" if object_type == PACK_DELTA else b"z") + zlib.compress(data)))
+        self._write_loose(objects)
+        self.pack = None
+
 class File:
     """Clase que representa un archivo en el sistema Git"""
-    def __init__(self, name: str, content: str = "", status: str = "A"):
-        self.name = name
+    __slots__ = ("blobs", "change_listener", "name", "_content", "status", "checksum", "path")
+    
+    def __init__(self, name: str, content: str = "", status: str = "A", checksum: Optional[str] = None):
+        self.blobs = None  # Almacén del que se lee el contenido bajo demanda
+        self.change_listener = None  # Función a la que se avisa de cada cambio
+        self.name = sys.intern(name)
         self.content = content
-        self.status = status  # A: Added, M: Modified, D: Deleted
-        self.checksum = self._calculate_checksum()
-        self.path = name  # Simplificado para este ejemplo
+        self.status = sys.intern(status)  # A: Added, M: Modified, D: Deleted
+        # El checksum puede venir ya calculado (p. ej. en un pool de hilos)
+        self.checksum = checksum if checksum is not None else self._calculate_checksum()
+        self.path = self.name  # Simplificado para este ejemplo
+    
+    @property
+    def content(self) -> str:
+        """Contenido del archivo; si no está en memoria se lee del almacén"""
+        if self._content is None and self.blobs is not None:
+            self._content = self.blobs.get(self.checksum)
+        return self._content
+    
+    @content.setter
+    def content(self, value: str):
+        self._content = value
     
     def _calculate_checksum(self) -> str:
         """Calcula el checksum SHA-1 del contenido del archivo"""
-        return hashlib.sha1(self.content.encode()).hexdigest()
+        return hash_content(self.content)
     
-    def update_content(self, new_content: str):
-        """Actualiza el contenido del archivo y recalcula el checksum"""
+    def update_content(self, new_content: str, checksum: Optional[str] = None):
+        """Actualiza el contenido del archivo y recalcula el checksum, salvo
+        que venga calculado o que el contenido no haya cambiado"""
+        if checksum is None and self._content is not None and new_content == self._content:
+            checksum = self.checksum
         self.content = new_content
         self.status = "M"
-        self.checksum = self._calculate_checksum()
+        self.checksum = checksum if checksum is not None else self._calculate_checksum()
+        if self.change_listener:
+            self.change_listener(self)
     
     def mark_as_deleted(self):
         """Marca el archivo como eliminado"""
         self.status = "D"
+        if self.change_listener:
+            self.change_listener(self)
+    
+    def to_dict(self, include_content: bool = True) -> Dict:
+        """Convierte el objeto a un diccionario para serialización.
+
+        Con include_content=False el contenido queda referenciado solo por
+        el checksum y debe estar en un BlobStore.
+        """
+        data = {
+            "name": self.name,
+            "status": self.status,
+            "checksum": self.checksum,
+            "path": self.path
+        }
+        if include_content:
+            data["content"] = self.content
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict, blobs: Optional[BlobStore] = None) -> 'File':
+        """Crea un objeto File desde un diccionario"""
+        file = cls(data["name"], data.get("content", ""), data["status"], data["checksum"])
+        file.path = sys.intern(data["path"])
+        if "content" not in data:
+            # El contenido se leerá del almacén la primera vez que se use
+            file.content = None
+            file.blobs = blobs
+        return file
+
+class CommitFile:
+    """Archivo registrado en un commit: solo su checksum, sin el contenido"""
+    __slots__ = ("name", "status", "checksum", "path")
+    
+    def __init__(self, name: str, status: str, checksum: str, path: str):
+        # Nombres, rutas y estados se repiten en muchos commits: se comparten
+        self.name = sys.intern(name)
+        self.status = sys.intern(status)
+        self.checksum = checksum
+        self.path = sys.intern(path)
+    
+    @classmethod
+    def from_file(cls, file: File) -> 'CommitFile':
+        """Registra el estado actual de un archivo"""
+        return cls(file.name, file.status, file.checksum, file.path)
     
     def to_dict(self) -> Dict:
         """Convierte el objeto a un diccionario para serialización"""
         return {
             "name": self.name,
-            "content": self.content,
             "status": self.status,
             "checksum": self.checksum,
             "path": self.path
         }
     
     @classmethod
-    def from_dict(cls, data: Dict) -> 'File':
-        """Crea un objeto File desde un diccionario"""
-        file = cls(data["name"], data["content"], data["status"])
-        file.checksum = data["checksum"]
-        file.path = data["path"]
-        return file
+    def from_dict(cls, data: Dict) -> 'CommitFile':
+        """Crea un objeto CommitFile desde un diccionario"""
+        return cls(data["name"], data["status"], data["checksum"], data["path"])
 
 class Commit:
     """Clase que representa un commit en el sistema Git"""
-    def __init__(self, message: str, author_email: str, branch_name: str = "main"):
-        self.id = self._generate_id()
-        self.timestamp = datetime.datetime.now().isoformat()
-        self.author_email = author_email
+    __slots__ = ("id", "timestamp", "author_email", "message", "parent_id", "parent_ids",
+                 "generation", "files", "branch_name", "conflicts", "tree")
+    
+    def __init__(self, message: str, author_email: str, branch_name: str = "main",
+                 commit_id: Optional[str] = None, timestamp: Optional[float] = None):
+        self.id = commit_id or self._generate_id()
+        self.timestamp = time.time() if timestamp is None else timestamp  # Segundos desde la época
+        self.author_email = sys.intern(author_email)
         self.message = message
-        self.parent_id = None
-        self.files = []  # Lista de archivos modificados
-        self.branch_name = branch_name
+        self.parent_id = None  # Primer padre
+        self.parent_ids = []  # Todos los padres (más de uno en los merges)
+        self.generation = 0  # 1 + generación máxima de los padres (0: sin calcular)
+        self.files = []  # Archivos modificados (CommitFile)
+        self.branch_name = sys.intern(branch_name)
+        self.conflicts = []  # Conflictos que quedaron marcados en un commit de merge
+        self.tree = None  # Estado completo de los archivos (PersistentMap ruta -> checksum), en memoria
     
     def _generate_id(self) -> str:
         """Genera un ID único para el commit (simulando SHA-1)"""
@@ -215,12 +1680,20 @@ class Commit:
         return hashlib.sha1((timestamp + random_str).encode()).hexdigest()[:10]
     
     def add_file(self, file: File):
-        """Añade un archivo al commit"""
-        self.files.append(file.to_dict())
+        """Añade un archivo al commit (solo su checksum, no el contenido)"""
+        self.files.append(CommitFile.from_file(file))
     
     def set_parent(self, parent_id: str):
         """Establece el ID del commit padre"""
         self.parent_id = parent_id
+        self.parent_ids = [parent_id]
+    
+    def add_parent(self, parent_id: str):
+        """Añade un padre adicional (commits de merge)"""
+        if not self.parent_ids:
+            self.set_parent(parent_id)
+        elif parent_id not in self.parent_ids:
+            self.parent_ids.append(parent_id)
     
     def to_dict(self) -> Dict:
         """Convierte el objeto a un diccionario para serialización"""
@@ -230,24 +1703,184 @@ class Commit:
             "author_email": self.author_email,
             "message": self.message,
             "parent_id": self.parent_id,
-            "files": self.files,
-            "branch_name": self.branch_name
+            "parent_ids": self.parent_ids,
+            "generation": self.generation,
+            "files": [file.to_dict() for file in self.files],
+            "branch_name": self.branch_name,
+            "conflicts": self.conflicts
         }
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'Commit':
         """Crea un objeto Commit desde un diccionario"""
-        commit = cls(data["message"], data["author_email"], data["branch_name"])
-        commit.id = data["id"]
-        commit.timestamp = data["timestamp"]
+        commit = cls(data["message"], data["author_email"], data["branch_name"],
+                     data["id"], _parse_timestamp(data["timestamp"]))
         commit.parent_id = data["parent_id"]
-        commit.files = data["files"]
+        commit.parent_ids = data.get("parent_ids") or ([data["parent_id"]] if data["parent_id"] else [])
+        commit.generation = data.get("generation", 0)
+        commit.files = [CommitFile.from_dict(file_data) for file_data in data["files"]]
+        commit.conflicts = data.get("conflicts", [])
         return commit
 
+class CommitGraph:
+    """Grafo de commits formado por los parent_ids.
+
+    Usa números de generación (guardados en cada commit) para recorrer el
+    grafo en orden topológico y podar la búsqueda: un commit nunca es
+    ancestro de otro con generación menor o igual.
+    """
+    def __init__(self, get_commit: Callable[[str], Optional[Commit]]):
+        self._get_commit = get_commit
+    
+    def generation(self, commit_id: str) -> int:
+        """Obtiene la generación de un commit, calculándola si hace falta"""
+        commit = self._get_commit(commit_id)
+        if not commit:
+            return 0
+        
+        # Recorrido en postorden iterativo para no agotar la recursión
+        stack = [commit]
+        while stack:
+            top = stack[-1]
+            if top.generation:
+                stack.pop()
+                continue
+            parents = [parent for parent in map(self._get_commit, top.parent_ids) if parent]
+            missing = [parent for parent in parents if not parent.generation]
+            if missing:
+                stack.extend(missing)
+                continue
+            top.generation = 1 + max((parent.generation for parent in parents), default=0)
+            stack.pop()
+        return commit.generation
+    
+    def walk(self, start_ids: List[str]):
+        """Recorre los ancestros de varios commits (incluidos) de mayor a menor generación"""
+        heap = []
+        seen = set()
+        for commit_id in start_ids:
+            if commit_id and commit_id not in seen and self._get_commit(commit_id):
+                seen.add(commit_id)
+                heapq.heappush(heap, (-self.generation(commit_id), commit_id))
+        
+        while heap:
+            _, commit_id = heapq.heappop(heap)
+            commit = self._get_commit(commit_id)
+            yield commit
+            for parent_id in commit.parent_ids:
+                if parent_id not in seen and self._get_commit(parent_id):
+                    seen.add(parent_id)
+                    heapq.heappush(heap, (-self.generation(parent_id), parent_id))
+    
+    def walk_by_date(self, start_ids: List[str]):
+        """Recorre los ancestros de varios commits (incluidos) del más nuevo
+        al más viejo por fecha: cuando sale un commit, todos los que quedan
+        por visitar son más viejos (salvo relojes desfasados)"""
+        heap = []
+        seen = set()
+        for commit_id in start_ids:
+            commit = self._get_commit(commit_id) if commit_id else None
+            if commit and commit_id not in seen:
+                seen.add(commit_id)
+                heapq.heappush(heap, (-commit.timestamp, commit_id))
+        
+        while heap:
+            _, commit_id = heapq.heappop(heap)
+            commit = self._get_commit(commit_id)
+            yield commit
+            for parent_id in commit.parent_ids:
+                parent = self._get_commit(parent_id)
+                if parent and parent_id not in seen:
+                    seen.add(parent_id)
+                    heapq.heappush(heap, (-parent.timestamp, parent_id))
+    
+    def _paint(self, first_id: Optional[str], second_id: Optional[str]):
+        """Recorre los ancestros de dos commits marcando desde cuál se alcanzan.
+
+        Produce tuplas (commit, marcas, pendientes) donde el bit 1 de las
+        marcas indica que el commit se alcanza desde el primero, el bit 2
+        desde el segundo, y `pendientes` cuenta los commits por visitar que
+        solo se alcanzan desde el primero. Cuando un commit sale del
+        montículo ya recibió las marcas de todos sus hijos, porque estos
+        tienen generación mayor.
+        """
+        flags = {}
+        heap = []
+        for commit_id, flag in ((first_id, 1), (second_id, 2)):
+            if commit_id and self._get_commit(commit_id):
+                if commit_id not in flags:
+                    heapq.heappush(heap, (-self.generation(commit_id), commit_id))
+                flags[commit_id] = flags.get(commit_id, 0) | flag
+        first_only = sum(1 for f in flags.values() if f == 1)
+        
+        while heap:
+            _, commit_id = heapq.heappop(heap)
+            commit = self._get_commit(commit_id)
+            commit_flags = flags[commit_id]
+            if commit_flags == 1:
+                first_only -= 1
+            for parent_id in commit.parent_ids:
+                if not self._get_commit(parent_id):
+                    continue
+                old_flags = flags.get(parent_id)
+                if old_flags is None:
+                    old_flags = 0
+                    heapq.heappush(heap, (-self.generation(parent_id), parent_id))
+                new_flags = old_flags | commit_flags
+                flags[parent_id] = new_flags
+                if old_flags != 1 and new_flags == 1:
+                    first_only += 1
+                elif old_flags == 1 and new_flags != 1:
+                    first_only -= 1
+            yield commit, commit_flags, first_only
+    
+    def merge_base(self, first_id: str, second_id: str) -> Optional[str]:
+        """Obtiene el mejor ancestro común (el de mayor generación) de dos commits"""
+        for commit, flags, _ in self._paint(first_id, second_id):
+            if flags == 3:
+                return commit.id
+        return None
+    
+    def is_ancestor(self, ancestor_id: str, descendant_id: str) -> bool:
+        """Indica si un commit es ancestro de otro (o el mismo)"""
+        target_generation = self.generation(ancestor_id)
+        if not target_generation:
+            return False
+        
+        stack = [descendant_id]
+        seen = set()
+        while stack:
+            commit_id = stack.pop()
+            if commit_id == ancestor_id:
+                return True
+            if commit_id in seen:
+                continue
+            seen.add(commit_id)
+            commit = self._get_commit(commit_id)
+            # Los ancestros tienen generación menor: se poda lo que ya está por
+            # debajo (calculándola: los commits antiguos la traen en 0)
+            if commit and self.generation(commit_id) > target_generation:
+                stack.extend(commit.parent_ids)
+        return False
+    
+    def commits_between(self, base_id: Optional[str], head_id: str) -> List[Commit]:
+        """Lista los commits alcanzables desde head_id pero no desde base_id
+        (base..head), del más nuevo al más viejo"""
+        result = []
+        for commit, flags, pending in self._paint(head_id, base_id):
+            if flags == 1:
+                result.append(commit)
+            # Lo que queda por visitar también se alcanza desde base
+            if not pending:
+                break
+        return result
+
 class Branch:
     """Clase que representa una rama en el sistema Git"""
+    __slots__ = ("name", "head_commit_id")
+    
     def __init__(self, name: str, head_commit_id: Optional[str] = None):
-        self.name = name
+        self.name = sys.intern(name)
         self.head_commit_id = head_commit_id
     
     def update_head(self, commit_id: str):
@@ -268,21 +1901,27 @@ class Branch:
 
 class PullRequest:
     """Clase que representa un pull request en el sistema Git"""
+    VALID_STATUSES = ["pending", "reviewing", "approved", "merged", "rejected"]
+    __slots__ = ("id", "title", "description", "author", "created_at", "source_branch",
+                 "target_branch", "commits", "modified_files", "reviewers", "closed_at",
+                 "status", "tags", "status_listener")
+    
     def __init__(self, title: str, description: str, author: str, 
-                 source_branch: str, target_branch: str):
-        self.id = self._generate_id()
+                 source_branch: str, target_branch: str, pr_id: Optional[str] = None):
+        self.id = pr_id or self._generate_id()
         self.title = title
         self.description = description
-        self.author = author
-        self.created_at = datetime.datetime.now().isoformat()
-        self.source_branch = source_branch
-        self.target_branch = target_branch
+        self.author = sys.intern(author)
+        self.created_at = time.time()
+        self.source_branch = sys.intern(source_branch)
+        self.target_branch = sys.intern(target_branch)
         self.commits = []  # Lista de IDs de commits asociados
         self.modified_files = []  # Lista de archivos modificados
         self.reviewers = []  # Lista de revisores asignados
         self.closed_at = None  # Fecha de cierre o fusión
         self.status = "pending"  # pending, reviewing, approved, merged, rejected
         self.tags = []  # Etiquetas asignadas
+        self.status_listener = None  # Función a la que se avisa de cada cambio de estado
     
     def _generate_id(self) -> str:
         """Genera un ID único para el pull request"""
@@ -307,11 +1946,13 @@ class PullRequest:
     
     def update_status(self, status: str):
         """Actualiza el estado del pull request"""
-        valid_statuses = ["pending", "reviewing", "approved", "merged", "rejected"]
-        if status in valid_statuses:
-            self.status = status
+        if status in self.VALID_STATUSES:
+            old_status = self.status
+            self.status = sys.intern(status)
             if status in ["merged", "rejected"]:
-                self.closed_at = datetime.datetime.now().isoformat()
+                self.closed_at = time.time()
+            if self.status_listener and old_status != status:
+                self.status_listener(self, old_status)
     
     def add_tag(self, tag: str):
         """Añade una etiqueta al pull request"""
@@ -344,53 +1985,307 @@ class PullRequest:
             data["description"], 
             data["author"], 
             data["source_branch"], 
-            data["target_branch"]
+            data["target_branch"],
+            data["id"]
         )
-        pr.id = data["id"]
-        pr.created_at = data["created_at"]
+        pr.created_at = _parse_timestamp(data["created_at"])
         pr.commits = data["commits"]
         pr.modified_files = data["modified_files"]
         pr.reviewers = data["reviewers"]
-        pr.closed_at = data["closed_at"]
-        pr.status = data["status"]
+        pr.closed_at = _parse_timestamp(data["closed_at"]) if data["closed_at"] else None
+        pr.status = sys.intern(data["status"])
         pr.tags = data["tags"]
         return pr
 
+class PullRequestQueue(Queue):
+    """Cola de pull requests con índices por ID y por estado.
+
+    Los índices se mantienen al encolar, desencolar y con cada cambio de
+    estado del pull request, de modo que buscar por ID u obtener el
+    siguiente pendiente es O(1).
+    """
+    def __init__(self):
+        super().__init__()
+        self._by_id = {}  # ID -> pull request
+        # Estado -> pull requests en ese estado (dict como conjunto ordenado)
+        self._by_status = {status: {} for status in PullRequest.VALID_STATUSES}
+    
+    def enqueue(self, item: PullRequest):
+        """Añade un pull request al final de la cola"""
+        super().enqueue(item)
+        self._by_id[item.id] = item
+        self._by_status.setdefault(item.status, {})[item.id] = item
+        item.status_listener = self._on_status_change
+    
+    def dequeue(self) -> Optional[PullRequest]:
+        """Elimina y retorna el primer pull request de la cola"""
+        item = super().dequeue()
+        if item:
+            del self._by_id[item.id]
+            self._by_status[item.status].pop(item.id, None)
+            item.status_listener = None
+        return item
+    
+    def find(self, key, value):
+        """Busca un pull request por un atributo; por ID usa el índice"""
+        if key == "id":
+            return self.get(value)
+        return super().find(key, value)
+    
+    def get(self, pr_id: str) -> Optional[PullRequest]:
+        """Obtiene un pull request por su ID"""
+        return self._by_id.get(pr_id)
+    
+    def by_status(self, status: str) -> List[PullRequest]:
+        """Lista los pull requests en un estado, en orden de llegada a ese estado"""
+        return list(self._by_status.get(status, {}).values())
+    
+    def next_with_status(self, status: str) -> Optional[PullRequest]:
+        """Obtiene el primer pull request en un estado"""
+        return next(iter(self._by_status.get(status, {}).values()), None)
+    
+    def _on_status_change(self, pr: PullRequest, old_status: str):
+        """Mueve un pull request al índice de su nuevo estado"""
+        self._by_status[old_status].pop(pr.id, None)
+        self._by_status.setdefault(pr.status, {})[pr.id] = pr
+
+class CommitJournal:
+    """Diario de solo-anexado (JSON Lines) con un registro por commit.
+
+    Los commits son inmutables, así que cada uno se escribe una única vez al
+    final del archivo: guardar un commit cuesta O(1) en lugar de reescribir
+    todo el historial.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.records = 0  # Registros válidos en el archivo
+        self.waste = 0  # Registros duplicados o corruptos que elimina la compactación
+        self.wasted_bytes = 0  # Bytes de esos registros en las líneas completas
+        self._valid_size = None  # Bytes hasta la última línea completa
+    
+    def read(self):
+        """Recorre los commits del diario ignorando duplicados y líneas corruptas.
+
+        Es un generador: cada línea se decodifica al pedirla, así que el
+        historial nunca está entero en memoria como diccionarios. Los
+        contadores quedan al día al terminar el recorrido.
+        """
+        seen_ids = set()
+        self.records = 0
+        self.waste = 0
+        self.wasted_bytes = 0
+        self._valid_size = 0
+        if not os.path.exists(self.path):
+            return
+        
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Escritura interrumpida: se recorta antes del siguiente anexado
+                    self.waste += 1
+                    break
+                self._valid_size += len(line)
+                try:
+                    commit_data = _RECORD_CODEC.loads(line)
+                except ValueError:
+                    self.waste += 1
+                    self.wasted_bytes += len(line)
+                    continue
+                if commit_data["id"] in seen_ids:
+                    self.waste += 1
+                    self.wasted_bytes += len(line)
+                    continue
+                seen_ids.add(commit_data["id"])
+                self.records += 1
+                yield commit_data
+    
+    def append(self, commits: List['Commit']):
+        """Anexa commits al final del diario y fuerza su escritura a disco"""
+        if not commits:
+            return
+        if self._valid_size is not None and os.path.exists(self.path) \
+                and os.path.getsize(self.path) > self._valid_size:
+            # Recortar solo una línea incompleta: las completas pueden ser de otro proceso
+            with open(self.path, 'rb') as f:
+                f.seek(self._valid_size)
+                tail = f.read()
+            os.truncate(self.path, self._valid_size + tail.rfind(b"\n") + 1)
+        with open(self.path, 'ab') as f:
+            start = f.tell()
+            try:
+                for commit in commits:
+                    f.write(_RECORD_CODEC.dumps(commit.to_dict()) + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            except BaseException:
+                # Los commits siguen pendientes y se vuelven a anexar en el
+                # próximo guardado: lo que alcanzó a escribirse queda duplicado
+                self.wasted_bytes += f.tell() - start
+                raise
+            self._valid_size = f.tell()
+        self.records += len(commits)
+    
+    def needs_compaction(self) -> bool:
+        """Indica si el diario contiene registros desperdiciados"""
+        return self.waste > 0
+    
+    def waste_ratio(self) -> float:
+        """Fracción del diario ocupada por registros desperdiciados"""
+        return self.wasted_bytes / self._valid_size if self._valid_size else 0.0
+    
+    def compact(self, commits: List['Commit']):
+        """Reescribe el diario de forma atómica con un registro por commit"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            for commit in commits:
+                f.write(_RECORD_CODEC.dumps(commit.to_dict()) + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+            self._valid_size = f.tell()
+        os.replace(tmp_path, self.path)
+        self.records = len(commits)
+        self.waste = 0
+        self.wasted_bytes = 0
+
+def _decode_repository(data: Optional[bytes], codec_name: str, journal_path: str):
+    """Decodifica el snapshot de un repositorio (None: se lee por partes al
+    construirlo) y los registros de su diario; se ejecuta en los procesos
+    de carga. Retorna también el diario, con sus contadores al día"""
+    journal = CommitJournal(journal_path)
+    records = list(journal.read())
+    return (None if data is None else get_codec(codec_name).loads(data)), journal, records
+
+_active_session = contextvars.ContextVar("active_session", default=None)
+
+class Workspace:
+    """Área de staging y archivos cambiados desde el último commit de quien
+    trabaja en un repositorio"""
+    def __init__(self, changed_names=()):
+        self.staging_area = Stack()  # Pila para el área de staging
+        self.staged_names = set()  # Nombres de los archivos en staging
+        self.changed_names = dict.fromkeys(changed_names)  # Conjunto ordenado
+
+class Session:
+    """Estado de un usuario del sistema: repositorio actual, rama actual y
+    área de staging en cada repositorio, y email.
+
+    Se activa con GitSystem.session_scope; sin sesión activa se usa el
+    estado único del sistema y de cada repositorio, como en el modo
+    interactivo.
+    """
+    def __init__(self, user_email: str):
+        self.repository_name = None
+        self.branches = {}  # Nombre de repositorio -> rama actual en esta sesión
+        self.workspaces = {}  # Nombre de repositorio -> Workspace de esta sesión
+        self.user_email = user_email
+
 class Repository:
     """Clase que representa un repositorio Git"""
-    def __init__(self, name: str, path: str):
+    def __init__(self, name: str, path: str, blobs: Optional[BlobStore] = None):
         self.name = name
         self.path = path
+        self.blobs = blobs if blobs is not None else BlobStore()  # Contenidos de los archivos
         self.commits = LinkedList()  # Lista enlazada de commits
-        self.staging_area = Stack()  # Pila para el área de staging
-        self.pull_requests = Queue()  # Cola para pull requests
-        self.branches = []  # Lista de ramas
-        self.current_branch = "main"  # Rama actual
+        self.pull_requests = PullRequestQueue()  # Cola para pull requests
+        self.branches = {}  # Ramas por nombre, en orden de creación
+        self._current_branch = "main"  # Rama actual fuera de una sesión (la que se guarda)
         self.files = {}  # Diccionario de archivos en el repositorio
+        self._workspace = Workspace()  # Staging y archivos cambiados fuera de una sesión (se guardan)
+        self.pending_commits = []  # Commits aún no escritos en el diario
+        self._commit_index = {}  # ID -> commit, para búsquedas en O(1)
+        self._sorted_commit_ids = None  # IDs ordenados para buscar por prefijo (None: por construir)
+        self.graph = CommitGraph(self.get_commit_by_id)  # Consultas de ancestros sobre los commits
+        self.diff_cache = LRUCache(DIFF_CACHE_SIZE)  # (checksum_a, checksum_b) -> líneas del diff
+        self.storage = "json"  # "json": diario de commits; "pack": packfile + diario
+        self.pack = None  # PackReader con los commits y contenidos empaquetados
+        self.snapshot_stamp = None  # Versión del snapshot en disco al leerlo o escribirlo
+        self._pack_lock = threading.Lock()  # Serializa la lectura de commits del pack
         
         # Crear rama principal
-        self.branches.append(Branch("main"))
+        self.branches["main"] = Branch("main")
     
     def get_branch(self, name: str) -> Optional[Branch]:
         """Obtiene una rama por su nombre"""
-        for branch in self.branches:
-            if branch.name == name:
-                return branch
-        return None
+        return self.branches.get(name)
+    
+    @property
+    def current_branch(self) -> str:
+        """Rama actual: la de la sesión activa, o la del repositorio si no hay sesión"""
+        session = _active_session.get()
+        if session is not None:
+            return session.branches.get(self.name, self._current_branch)
+        return self._current_branch
+    
+    @current_branch.setter
+    def current_branch(self, branch_name: str):
+        session = _active_session.get()
+        if session is not None:
+            session.branches[self.name] = branch_name
+        else:
+            self._current_branch = branch_name
     
     def get_current_branch(self) -> Branch:
         """Obtiene la rama actual"""
         return self.get_branch(self.current_branch)
     
+    @property
+    def workspace(self) -> Workspace:
+        """Staging y archivos cambiados de la sesión activa, o los del
+        repositorio si no hay sesión: un commit solo lleva lo que preparó
+        quien lo hace"""
+        session = _active_session.get()
+        if session is None:
+            return self._workspace
+        workspace = session.workspaces.get(self.name)
+        if workspace is None:
+            workspace = session.workspaces[self.name] = Workspace()
+        return workspace
+    
+    def track_file(self, file: File):
+        """Registra un archivo del repositorio para seguir sus cambios"""
+        self.files[file.name] = file
+        file.change_listener = self._on_file_change
+    
+    def _on_file_change(self, file: File):
+        """Guarda el nuevo contenido y anota el archivo como cambiado desde el último commit"""
+        # La versión del último commit de la rama sirve de base para el delta
+        branch = self.get_current_branch()
+        base = self.get_snapshot(branch.head_commit_id).get(file.path) if branch else None
+        self.blobs.intern(file, base)
+        self.workspace.changed_names[file.name] = None
+    
     def add_file_to_staging(self, file: File):
         """Añade un archivo al área de staging"""
-        self.staging_area.push(file)
+        self._on_file_change(file)
+        workspace = self.workspace
+        workspace.staging_area.push(file)
+        workspace.staged_names.add(file.name)
         # Actualizar o añadir el archivo al repositorio
-        self.files[file.name] = file
+        self.track_file(file)
+    
+    def get_status(self) -> Dict[str, List[str]]:
+        """Clasifica los archivos cambiados; el costo depende solo de cuántos cambiaron"""
+        workspace = self.workspace
+        staged_files = workspace.staging_area.to_list()
+        modified, untracked = [], []
+        for name in workspace.changed_names:
+            if name in workspace.staged_names:
+                continue
+            status = self.files[name].status
+            if status == "M":
+                modified.append(name)
+            elif status == "A":
+                untracked.append(name)
+        return {
+            "staged_files": [file.name for file in staged_files],
+            "modified_files": modified,
+            "untracked_files": untracked
+        }
     
     def create_commit(self, message: str, author_email: str) -> Optional[Commit]:
         """Crea un nuevo commit con los archivos en el área de staging"""
-        if self.staging_area.is_empty():
+        workspace = self.workspace
+        if workspace.staging_area.is_empty():
             print("No hay archivos en el área de staging para hacer commit.")
             return None
         
@@ -404,13 +2299,18 @@ class Repository:
         
         # Añadir archivos del área de staging al commit
         staged_files = []
-        while not self.staging_area.is_empty():
-            file = self.staging_area.pop()
+        while not workspace.staging_area.is_empty():
+            file = workspace.staging_area.pop()
             commit.add_file(file)
             staged_files.append(file)
+            workspace.changed_names.pop(file.name, None)
+        workspace.staged_names.clear()
         
         # Añadir el commit a la lista de commits
-        self.commits.append(commit)
+        self.add_commit(commit)
+        self.graph.generation(commit.id)
+        self.get_snapshot(commit.id)
+        self.pending_commits.append(commit)
         
         # Actualizar el head de la rama actual
         current_branch.update_head(commit.id)
@@ -439,33 +2339,97 @@ class Repository:
         
         # Crear la nueva rama
         new_branch = Branch(branch_name, head_commit_id)
-        self.branches.append(new_branch)
+        self.branches[branch_name] = new_branch
         
         return True
     
+    def add_commit(self, commit: Commit):
+        """Añade un commit a la lista de commits y a sus índices"""
+        self.commits.append(commit)
+        self._commit_index[commit.id] = commit
+        if self._sorted_commit_ids is not None:
+            bisect.insort(self._sorted_commit_ids, commit.id)
+    
     def get_commit_by_id(self, commit_id: str) -> Optional[Commit]:
-        """Obtiene un commit por su ID"""
-        current = self.commits.head
-        while current:
-            if current.data.id == commit_id:
-                return current.data
-            current = current.next
-        return None
+        """Obtiene un commit por su ID; si está empaquetado se lee solo ese objeto"""
+        commit = self._commit_index.get(commit_id)
+        if commit is None and self.pack is not None and commit_id:
+            # Los comandos de consulta pueden llegar aquí a la vez desde varios hilos
+            with self._pack_lock:
+                commit = self._commit_index.get(commit_id)
+                packed = self.pack.get(commit_id) if commit is None else None
+                if packed and packed[0] == PACK_COMMIT:
+                    # Queda en el índice como caché, pero no en la lista de commits sin empaquetar
+                    commit = self.commit_from_dict(_RECORD_CODEC.loads(packed[1]))
+                    self._commit_index[commit.id] = commit
+                    if self._sorted_commit_ids is not None:
+                        bisect.insort(self._sorted_commit_ids, commit.id)
+        return commit
+    
+    def iter_commits(self):
+        """Recorre todos los commits, empaquetados o no"""
+        if self.pack is not None:
+            for commit_id in self.pack.ids(PACK_COMMIT):
+                yield self.get_commit_by_id(commit_id)
+        for commit in self.commits.to_list():
+            if self.pack is None or commit.id not in self.pack:
+                yield commit
+    
+    def find_commits_by_prefix(self, prefix: str, limit: int = 2) -> List[Commit]:
+        """Obtiene hasta `limit` commits cuyo ID empieza por el prefijo dado"""
+        if self._sorted_commit_ids is None:
+            # Se ordena una sola vez, en la primera búsqueda por prefijo
+            self._sorted_commit_ids = sorted(self._commit_index)
+        
+        ids = self._sorted_commit_ids
+        matches = []
+        position = bisect.bisect_left(ids, prefix)
+        while position < len(ids) and len(matches) < limit and ids[position].startswith(prefix):
+            matches.append(self._commit_index[ids[position]])
+            position += 1
+        
+        if self.pack is not None and len(matches) < limit:
+            for commit_id in self.pack.find_prefix(prefix, limit + len(matches)):
+                commit = self.get_commit_by_id(commit_id)
+                if len(matches) < limit and commit and commit not in matches:
+                    matches.append(commit)
+        return matches
+    
+    def resolve_commit(self, commit_ref: str) -> Optional[Commit]:
+        """Obtiene un commit por su ID completo o por un prefijo único"""
+        commit = self.get_commit_by_id(commit_ref)
+        if commit or not commit_ref:
+            return commit
+        
+        matches = self.find_commits_by_prefix(commit_ref)
+        if len(matches) > 1:
+            print(f"El prefijo '{commit_ref}' es ambiguo.")
+            return None
+        return matches[0] if matches else None
+    
+    def iter_history(self, commit_id: Optional[str] = None):
+        """Recorre el historial desde un commit (por defecto el head de la rama
+        actual) siguiendo todos sus padres, del más nuevo al más viejo"""
+        if commit_id is None:
+            current_branch = self.get_current_branch()
+            commit_id = current_branch.head_commit_id if current_branch else None
+        
+        yield from self.graph.walk([commit_id])
     
     def checkout_commit(self, commit_id: str) -> bool:
         """Cambia al estado de un commit específico"""
-        commit = self.get_commit_by_id(commit_id)
+        commit = self.resolve_commit(commit_id)
         if not commit:
             print(f"El commit '{commit_id}' no existe.")
             return False
         
         # Crear una rama temporal para el commit
-        temp_branch_name = f"temp-{commit_id[:6]}"
+        temp_branch_name = f"temp-{commit.id[:6]}"
         self.create_branch(temp_branch_name)
         
         # Actualizar el head de la rama temporal
         temp_branch = self.get_branch(temp_branch_name)
-        temp_branch.update_head(commit_id)
+        temp_branch.update_head(commit.id)
         
         # Cambiar a la rama temporal
         self.checkout_branch(temp_branch_name)
@@ -476,11 +2440,13 @@ class Repository:
                            source_branch: str, target_branch: str) -> Optional[PullRequest]:
         """Crea un nuevo pull request"""
         # Verificar que las ramas existen
-        if not self.get_branch(source_branch):
+        source_branch_obj = self.get_branch(source_branch)
+        if not source_branch_obj:
             print(f"La rama de origen '{source_branch}' no existe.")
             return None
         
-        if not self.get_branch(target_branch):
+        target_branch_obj = self.get_branch(target_branch)
+        if not target_branch_obj:
             print(f"La rama de destino '{target_branch}' no existe.")
             return None
         
@@ -488,11 +2454,14 @@ class Repository:
         pr = PullRequest(title, description, author, source_branch, target_branch)
         
         # Añadir commits de la rama de origen que no están en la rama de destino
-        source_branch_obj = self.get_branch(source_branch)
-        target_branch_obj = self.get_branch(target_branch)
-        
         if source_branch_obj.head_commit_id:
-            pr.add_commit(source_branch_obj.head_commit_id)
+            new_commits = self.graph.commits_between(target_branch_obj.head_commit_id,
+                                                     source_branch_obj.head_commit_id)
+            new_commits.reverse()
+            # Se asignan directamente para no pagar la búsqueda lineal de add_commit
+            pr.commits = [commit.id for commit in new_commits]
+            pr.modified_files = list(dict.fromkeys(
+                file.path for commit in new_commits for file in commit.files))
         
         # Añadir el pull request a la cola
         self.pull_requests.enqueue(pr)
@@ -501,7 +2470,7 @@ class Repository:
     
     def review_pull_request(self, pr_id: str, reviewer: str) -> bool:
         """Revisa un pull request"""
-        pr = self.pull_requests.find("id", pr_id)
+        pr = self.pull_requests.get(pr_id)
         if not pr:
             print(f"El pull request '{pr_id}' no existe.")
             return False
@@ -512,7 +2481,7 @@ class Repository:
     
     def approve_pull_request(self, pr_id: str) -> bool:
         """Aprueba un pull request"""
-        pr = self.pull_requests.find("id", pr_id)
+        pr = self.pull_requests.get(pr_id)
         if not pr:
             print(f"El pull request '{pr_id}' no existe.")
             return False
@@ -522,7 +2491,7 @@ class Repository:
     
     def reject_pull_request(self, pr_id: str) -> bool:
         """Rechaza un pull request"""
-        pr = self.pull_requests.find("id", pr_id)
+        pr = self.pull_requests.get(pr_id)
         if not pr:
             print(f"El pull request '{pr_id}' no existe.")
             return False
@@ -530,9 +2499,141 @@ class Repository:
         pr.update_status("rejected")
         return True
     
-    def merge_pull_request(self, pr_id: str) -> bool:
-        """Fusiona un pull request aprobado"""
-        pr = self.pull_requests.find("id", pr_id)
+    def get_snapshot(self, commit_id: Optional[str]) -> PersistentMap:
+        """Obtiene el árbol inmutable (ruta -> checksum) de un commit.
+
+        Cada commit guarda los cambios respecto a su primer padre; el árbol
+        se construye una vez aplicándolos sobre el árbol del padre, con el
+        que comparte todos los nodos que no cambiaron, y queda en caché.
+        """
+        # Buscar el ancestro más cercano que ya tiene su árbol
+        chain = []
+        tree = PersistentMap()
+        while commit_id:
+            commit = self.get_commit_by_id(commit_id)
+            if not commit:
+                break
+            if commit.tree is not None:
+                tree = commit.tree
+                break
+            chain.append(commit)
+            commit_id = commit.parent_id
+        
+        for commit in reversed(chain):
+            for file in commit.files:
+                if file.status == "D":
+                    tree = tree.delete(file.path)
+                else:
+                    tree = tree.set(file.path, file.checksum)
+            commit.tree = tree
+        return tree
+    
+    def resolve_revision(self, ref: str) -> Optional[Commit]:
+        """Obtiene un commit a partir de un nombre de rama, un ID o un prefijo de ID"""
+        branch = self.get_branch(ref)
+        if branch:
+            return self.get_commit_by_id(branch.head_commit_id) if branch.head_commit_id else None
+        return self.resolve_commit(ref)
+    
+    def diff_file(self, old_checksum: Optional[str], new_checksum: Optional[str]) -> List[str]:
+        """Calcula el diff unificado entre dos contenidos, usando la caché"""
+        key = (old_checksum, new_checksum)
+        lines = self.diff_cache.get(key)
+        if lines is None:
+            old_lines = self.blobs.get(old_checksum).splitlines(True) if old_checksum else []
+            new_lines = self.blobs.get(new_checksum).splitlines(True) if new_checksum else []
+            lines = unified_diff(old_lines, new_lines)
+            self.diff_cache.put(key, lines)
+        return lines
+    
+    def diff_trees(self, old_tree: PersistentMap, new_tree: PersistentMap) -> List[Dict]:
+        """Compara dos árboles y retorna el diff de cada archivo que cambió.
+
+        Los archivos con el mismo checksum se saltan sin leer su contenido.
+        """
+        changes = sorted(old_tree.diff(new_tree), key=lambda change: change[0])
+        return self._diff_changes(changes)
+    
+    def diff_working_tree(self) -> List[Dict]:
+        """Compara el head de la rama actual con los archivos cambiados desde el último commit"""
+        current_branch = self.get_current_branch()
+        head_tree = self.get_snapshot(current_branch.head_commit_id if current_branch else None)
+        changes = []
+        for name in self.workspace.changed_names:
+            file = self.files[name]
+            new_checksum = None if file.status == "D" else file.checksum
+            old_checksum = head_tree.get(file.path)
+            if old_checksum != new_checksum:
+                changes.append((file.path, old_checksum, new_checksum))
+        return self._diff_changes(changes)
+    
+    def _diff_changes(self, changes: List[tuple]) -> List[Dict]:
+        """Arma el resultado de un diff a partir de tuplas (ruta, checksum viejo, checksum nuevo)"""
+        result = []
+        for path, old_checksum, new_checksum in changes:
+            if old_checksum is None:
+                status = "A"
+            elif new_checksum is None:
+                status = "D"
+            else:
+                status = "M"
+            result.append({
+                "path": path,
+                "status": status,
+                "old_checksum": old_checksum,
+                "new_checksum": new_checksum,
+                "diff": self.diff_file(old_checksum, new_checksum)
+            })
+        return result
+    
+    def _merge_snapshots(self, base: PersistentMap, ours: PersistentMap, theirs: PersistentMap,
+                         ours_label: str, theirs_label: str):
+        """Fusiona a tres vías el estado de los archivos de dos commits.
+
+        Retorna (cambios, conflictos): los cambios son las entradas de archivo
+        respecto a `ours` y los conflictos describen qué quedó marcado.
+        """
+        changes = []
+        conflicts = []
+        # Solo importan las rutas que cambiaron en `theirs`; los árboles
+        # comparten los subárboles iguales, así que no se recorre todo
+        for path, base_checksum, theirs_checksum in base.diff(theirs):
+            ours_checksum = ours.get(path)
+            # Se comparan checksums: el contenido solo se lee si ambos lados cambiaron
+            if ours_checksum == theirs_checksum:
+                continue
+            if ours_checksum == base_checksum:
+                merged_checksum = theirs_checksum
+            elif ours_checksum is None or theirs_checksum is None:
+                # Borrado en un lado y modificado en el otro: se conserva la versión modificada
+                conflicts.append({"path": path, "type": "modify/delete"})
+                merged_checksum = ours_checksum or theirs_checksum
+            else:
+                base_lines = self.blobs.get(base_checksum).splitlines(True) if base_checksum else []
+                merged, file_conflicts = merge_lines(
+                    base_lines,
+                    self.blobs.get(ours_checksum).splitlines(True),
+                    self.blobs.get(theirs_checksum).splitlines(True),
+                    ours_label, theirs_label)
+                merged_checksum = self.blobs.put("".join(merged))
+                if file_conflicts:
+                    conflicts.append({"path": path, "type": "content", "regions": file_conflicts})
+            
+            if merged_checksum is None:
+                changes.append(CommitFile(path, "D", ours_checksum, path))
+            elif merged_checksum != ours_checksum:
+                status = "M" if ours_checksum else "A"
+                changes.append(CommitFile(path, status, merged_checksum, path))
+        return changes, conflicts
+    
+    def merge_pull_request(self, pr_id: str, author_email: Optional[str] = None) -> bool:
+        """Fusiona un pull request aprobado.
+
+        Si la rama de destino no avanzó se mueve su head (fast-forward); si
+        ambas ramas avanzaron se crea un commit de merge con dos padres a
+        partir de la base común, registrando los conflictos que queden.
+        """
+        pr = self.pull_requests.get(pr_id)
         if not pr:
             print(f"El pull request '{pr_id}' no existe.")
             return False
@@ -541,64 +2642,210 @@ class Repository:
             print(f"El pull request '{pr_id}' no está aprobado.")
             return False
         
-        # Implementación simplificada de la fusión
-        pr.update_status("merged")
-        
-        # Actualizar la rama de destino para que apunte al último commit de la rama de origen
         source_branch = self.get_branch(pr.source_branch)
         target_branch = self.get_branch(pr.target_branch)
-        
         if source_branch and target_branch and source_branch.head_commit_id:
-            target_branch.update_head(source_branch.head_commit_id)
+            self._merge_branches(pr, source_branch, target_branch, author_email)
         
+        # Recién ahora, con el merge hecho: si falla, el pull request sigue aprobado
+        pr.update_status("merged")
         return True
     
-    def to_dict(self) -> Dict:
-        """Convierte el objeto a un diccionario para serialización"""
-        return {
+    def _merge_branches(self, pr: PullRequest, source_branch: Branch, target_branch: Branch,
+                        author_email: Optional[str]):
+        """Lleva los cambios de la rama de origen de un pull request a la de destino"""
+        source_id = source_branch.head_commit_id
+        target_id = target_branch.head_commit_id
+        if not target_id or self.graph.is_ancestor(target_id, source_id):
+            # Fast-forward
+            target_branch.update_head(source_id)
+            return
+        if self.graph.is_ancestor(source_id, target_id):
+            # La rama de destino ya contiene todos los cambios
+            return
+        
+        base_id = self.graph.merge_base(target_id, source_id)
+        changes, conflicts = self._merge_snapshots(
+            self.get_snapshot(base_id), self.get_snapshot(target_id), self.get_snapshot(source_id),
+            pr.target_branch, pr.source_branch)
+        
+        merge_commit = Commit(f"Merge pull request {pr.id} de '{pr.source_branch}' a '{pr.target_branch}'",
+                              author_email or pr.author, pr.target_branch)
+        merge_commit.set_parent(target_id)
+        merge_commit.add_parent(source_id)
+        merge_commit.files = changes
+        merge_commit.conflicts = conflicts
+        
+        self.add_commit(merge_commit)
+        self.graph.generation(merge_commit.id)
+        self.get_snapshot(merge_commit.id)
+        self.pending_commits.append(merge_commit)
+        target_branch.update_head(merge_commit.id)
+    
+    def commit_from_dict(self, data: Dict) -> Commit:
+        """Crea un commit de este repositorio, moviendo al almacén el contenido
+        de los archivos guardados en el formato antiguo"""
+        self._import_inline_content(data)
+        return Commit.from_dict(data)
+    
+    def _import_inline_content(self, commit_data: Dict):
+        """Mueve al almacén el contenido guardado dentro de un commit antiguo"""
+        for file_data in commit_data["files"]:
+            if "content" in file_data:
+                self.blobs.put(file_data.pop("content"), file_data["checksum"])
+    
+    def to_dict(self, include_commits: bool = True) -> Dict:
+        """Convierte el objeto a un diccionario para serialización.
+
+        Con include_commits=False se obtiene solo la parte mutable (ramas,
+        archivos, pull requests); los commits se guardan en el diario.
+        """
+        data = {
             "name": self.name,
             "path": self.path,
-            "commits": [commit.to_dict() for commit in self.commits.to_list()],
-            "branches": [branch.to_dict() for branch in self.branches],
-            "current_branch": self.current_branch,
-            "files": {name: file.to_dict() for name, file in self.files.items()},
-            "pull_requests": [pr.to_dict() for pr in self.pull_requests.to_list()]
+            "branches": [branch.to_dict() for branch in self.branches.values()],
+            "current_branch": self._current_branch,
+            "files": {name: file.to_dict(include_content=False)
+                      for name, file in self.files.items()},
+            "changed_files": list(self._workspace.changed_names),
+            "pull_requests": [pr.to_dict() for pr in self.pull_requests.to_list()],
+            "storage": self.storage
         }
+        if include_commits:
+            data["commits"] = [commit.to_dict() for commit in self.iter_commits()]
+        return data
+    
+    def to_pack(self, pack_path: str, index_path: str):
+        """Alternativa binaria a to_dict: escribe todos los commits y contenidos
+        en un packfile con índice (ver write_pack).
+
+        El pack anterior se lee mientras se escribe el nuevo y se cierra
+        antes de reemplazar sus archivos: queda sin pack hasta que se
+        adjunte el nuevo.
+        """
+        def objects():
+            if self.pack is not None:
+                yield from self.pack.iter_raw()
+            for commit in self.commits.to_list():
+                yield commit.id, PACK_COMMIT, zlib.compress(_RECORD_CODEC.dumps(commit.to_dict()))
+            for checksum in self.blobs.checksums():
+                if self.pack is None or checksum not in self.pack:
+                    object_type, data = self.blobs.read_raw(checksum)
+                    yield checksum, object_type, zlib.compress(data)
+        
+        # En Windows no se puede reemplazar un archivo mapeado, y en POSIX el
+        # mapeo viejo seguiría mostrando el pack anterior
+        write_pack(pack_path, index_path, objects(), before_replace=lambda: self.attach_pack(None))
+    
+    def attach_pack(self, pack: Optional['PackReader']):
+        """Usa un packfile como origen de los commits y contenidos que no están en memoria"""
+        if self.pack is not None and self.pack is not pack:
+            self.pack.close()
+        self.pack = pack
+        self.blobs.pack = pack
     
     @classmethod
-    def from_dict(cls, data: Dict) -> 'Repository':
+    def from_dict(cls, data: Dict, blobs: Optional[BlobStore] = None) -> 'Repository':
         """Crea un objeto Repository desde un diccionario"""
-        repo = cls(data["name"], data["path"])
+        repo = cls(data["name"], data["path"], blobs)
         
         # Cargar ramas
-        repo.branches = []
+        repo.branches = {}
         for branch_data in data["branches"]:
-            repo.branches.append(Branch.from_dict(branch_data))
+            branch = Branch.from_dict(branch_data)
+            repo.branches[branch.name] = branch
         
         # Cargar rama actual
-        repo.current_branch = data["current_branch"]
+        repo._current_branch = data["current_branch"]
+        repo.storage = data.get("storage", "json")
         
         # Cargar archivos
         repo.files = {}
         for name, file_data in data["files"].items():
-            repo.files[name] = File.from_dict(file_data)
+            repo.track_file(File.from_dict(file_data, repo.blobs))
+            if "content" in file_data:
+                # Formato antiguo: mover el contenido al almacén
+                repo.blobs.intern(repo.files[name])
         
-        # Cargar commits
-        for commit_data in data["commits"]:
-            repo.commits.append(Commit.from_dict(commit_data))
+        # Los archivos antiguos no guardan qué cambió: se consideran todos los A/M
+        if "changed_files" in data:
+            changed_names = data["changed_files"]
+        else:
+            changed_names = [name for name, file in repo.files.items() if file.status in ("A", "M")]
+        repo._workspace = Workspace(changed_names)
+        
+        # Cargar commits (los archivos antiguos los incluyen en el propio JSON)
+        for commit_data in data.get("commits", []):
+            repo.add_commit(repo.commit_from_dict(commit_data))
         
         # Cargar pull requests
         for pr_data in data["pull_requests"]:
             repo.pull_requests.enqueue(PullRequest.from_dict(pr_data))
         
         return repo
+    
+    @classmethod
+    def from_stream(cls, reader: JsonStreamReader, blobs: Optional[BlobStore] = None) -> 'Repository':
+        """Como from_dict, pero leyendo el documento de forma incremental: cada
+        commit se convierte al leerlo, sin mantener el arreglo de diccionarios"""
+        data = {}
+        commits = []
+        contents = []  # (contenido, checksum) guardados dentro de commits antiguos
+        for key, value in reader.iter_object(stream_keys=("commits",)):
+            if key == "commits":
+                for commit_data in value:
+                    for file_data in commit_data["files"]:
+                        if "content" in file_data:
+                            contents.append((file_data.pop("content"), file_data["checksum"]))
+                    commits.append(Commit.from_dict(commit_data))
+            else:
+                data[key] = value
+        
+        repo = cls.from_dict(data, blobs)
+        for content, checksum in contents:
+            repo.blobs.put(content, checksum)
+        for commit in commits:
+            repo.add_commit(commit)
+        return repo
 
 class GitSystem:
-    """Clase principal que gestiona el sistema Git"""
-    def __init__(self):
-        self.repositories = LinkedList()
-        self.current_repository = None
-        self.user_email = "usuario@example.com"  # Email por defecto
+    """Clase principal que gestiona el sistema Git.
+
+    Puede atender a varios usuarios desde distintos hilos: cada uno usa su
+    Session (repositorio y rama actuales, email), los comandos toman el
+    candado de lectura o escritura de su repositorio, y las lecturas y
+    escrituras en data/ se hacen con un candado de archivo compartido con
+    otros procesos. Un comando que modifica y guarda su repositorio toma
+    además el candado de archivo de ese repositorio, para que otro proceso
+    no lo guarde entre la lectura y el guardado. Orden de los candados:
+    repositorio, archivo del repositorio, sistema, data/.
+    """
+    READ_ONLY_COMMANDS = {"status", "log", "diff"}  # Toman el candado de lectura
+    READ_ONLY_PR_COMMANDS = {"status", "list"}
+    
+    def __init__(self, max_loaded_repositories: Optional[int] = MAX_LOADED_REPOSITORIES,
+                 codec: Optional[JsonCodec] = None, workers: int = IO_WORKERS,
+                 decode_processes: int = DECODE_PROCESSES):
+        self.repositories = LinkedList()  # Nombres de los repositorios en orden del índice
+        self._repository_names = set()  # Los mismos nombres, para búsquedas en O(1)
+        self._loaded = OrderedDict()  # Repositorios cargados, del menos al más usado
+        self.max_loaded_repositories = max_loaded_repositories
+        self._current_repository = None  # Repositorio actual fuera de una sesión
+        self._user_email = "usuario@example.com"  # Email por defecto
+        self._lock = threading.RLock()  # Protege el índice y los repositorios cargados
+        self._repo_locks = {}  # Candado de lectura/escritura por repositorio
+        self._repo_file_locks = {}  # Candado entre procesos por repositorio
+        self._in_use = {}  # Comandos en curso por repositorio: no se descargan
+        self._data_lock = FileLock(os.path.join(DATA_DIR, ".lock"))  # Candado de data/ entre procesos
+        self._dirty_repos = set()  # Nombres de repositorios con cambios sin guardar
+        self._index_dirty = False  # Indica si el índice de repositorios cambió
+        self._journals = {}  # Diarios de commits por nombre de repositorio
+        self.codec = codec or get_codec()  # Codec de los archivos JSON de datos
+        self.workers = max(1, workers)  # Hilos para leer o guardar varios repositorios
+        self.decode_processes = decode_processes  # Procesos para decodificar al cargar varios
+        self.autosave = True  # Guardar tras cada comando (False: el llamador llama a _save_data)
+        self._flusher = None  # Hilo de escritura diferida, si está activa
+        self.interactive = True  # Pedir con input() los datos que falten en un comando
         
         # Asegurar que existe el directorio de datos
         if not os.path.exists(DATA_DIR):
@@ -607,67 +2854,582 @@ class GitSystem:
         # Cargar datos si existen
         self._load_data()
     
+    @property
+    def current_repository(self) -> Optional[Repository]:
+        """Repositorio actual de la sesión activa (o del sistema si no hay sesión)"""
+        session = _active_session.get()
+        if session is None:
+            return self._current_repository
+        return self.get_repository(session.repository_name) if session.repository_name else None
+    
+    @current_repository.setter
+    def current_repository(self, repo: Optional[Repository]):
+        session = _active_session.get()
+        if session is None:
+            self._current_repository = repo
+        else:
+            session.repository_name = repo.name if repo else None
+    
+    @property
+    def user_email(self) -> str:
+        """Email del usuario de la sesión activa (o del sistema si no hay sesión)"""
+        session = _active_session.get()
+        return session.user_email if session is not None else self._user_email
+    
+    @user_email.setter
+    def user_email(self, email: str):
+        session = _active_session.get()
+        if session is None:
+            self._user_email = email
+        else:
+            session.user_email = email
+    
+    def create_session(self) -> Session:
+        """Crea una sesión nueva con el email por defecto del sistema"""
+        return Session(self._user_email)
+    
+    @contextlib.contextmanager
+    def session_scope(self, session: Session):
+        """Activa una sesión para el hilo o la tarea actual"""
+        token = _active_session.set(session)
+        try:
+            yield session
+        finally:
+            _active_session.reset(token)
+    
+    @contextlib.contextmanager
+    def read_scope(self):
+        """Toma el candado de lectura del repositorio actual, para leer sus
+        objetos fuera de un comando sin que otra sesión los modifique"""
+        name = self._current_repository_name()
+        if name is None:
+            yield
+            return
+        with self._get_repo_lock(name).read():
+            yield
+    
+    def _current_repository_name(self) -> Optional[str]:
+        """Nombre del repositorio actual sin cargarlo"""
+        session = _active_session.get()
+        if session is not None:
+            return session.repository_name
+        return self._current_repository.name if self._current_repository else None
+    
+    def _get_repo_lock(self, repo_name: str) -> RWLock:
+        """Obtiene el candado de lectura/escritura de un repositorio"""
+        with self._lock:
+            if repo_name not in self._repo_locks:
+                self._repo_locks[repo_name] = RWLock()
+            return self._repo_locks[repo_name]
+    
+    def _get_repo_file_lock(self, repo_name: str) -> FileLock:
+        """Obtiene el candado entre procesos de un repositorio"""
+        with self._lock:
+            if repo_name not in self._repo_file_locks:
+                path = os.path.join(DATA_DIR, f"{repo_name}.lock")
+                self._repo_file_locks[repo_name] = FileLock(path)
+            return self._repo_file_locks[repo_name]
+    
     def _get_repo_file_path(self, repo_name: str) -> str:
         """Obtiene la ruta del archivo JSON para un repositorio"""
         return os.path.join(DATA_DIR, f"{repo_name}.json")
     
+    def _snapshot_stamp(self, repo_name: str) -> Optional[tuple]:
+        """Identifica la versión del snapshot en disco de un repositorio sin
+        leerlo: cada guardado lo reemplaza por un archivo nuevo"""
+        try:
+            stat = os.stat(self._get_repo_file_path(repo_name))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+    
+    def _get_journal(self, repo_name: str) -> CommitJournal:
+        """Obtiene el diario de commits de un repositorio"""
+        journal = self._journals.get(repo_name)
+        if journal is None:
+            # setdefault es atómico: dos hilos obtienen el mismo diario
+            path = os.path.join(DATA_DIR, f"{repo_name}.journal")
+            journal = self._journals.setdefault(repo_name, CommitJournal(path))
+        return journal
+    
+    def _get_blob_store(self, repo_name: str) -> BlobStore:
+        """Crea el almacén de contenidos en disco de un repositorio"""
+        return BlobStore(os.path.join(OBJECTS_DIR, repo_name))
+    
+    def _get_pack_paths(self, repo_name: str):
+        """Obtiene las rutas del packfile y su índice para un repositorio"""
+        return (os.path.join(DATA_DIR, f"{repo_name}.pack"),
+                os.path.join(DATA_DIR, f"{repo_name}.idx"))
+    
+    def _pack_repository(self, repo: Repository):
+        """Empaqueta todos los commits y contenidos de un repositorio"""
+        with self._data_lock:
+            # Todo lo pendiente debe estar en disco antes de empaquetar
+            self._save_repository(repo)
+            pack_path, index_path = self._get_pack_paths(repo.name)
+            try:
+                repo.to_pack(pack_path, index_path)
+            finally:
+                # El pack nuevo, o el anterior si falló antes de reemplazarlo
+                if os.path.exists(pack_path):
+                    repo.attach_pack(PackReader(pack_path, index_path))
+            repo.storage = "pack"
+            
+            # Los commits ya están en el pack: el diario vuelve a empezar vacío
+            repo.commits = LinkedList()
+            _write_json_atomic(self._get_repo_file_path(repo.name), repo.to_dict(include_commits=False),
+                               self.codec)
+            repo.snapshot_stamp = self._snapshot_stamp(repo.name)
+            self._get_journal(repo.name).compact([])
+            repo.blobs.prune_loose()
+    
+    def _unpack_repository(self, repo: Repository):
+        """Vuelve a guardar un repositorio empaquetado como diario y contenidos sueltos"""
+        if repo.pack is None:
+            return
+        with self._data_lock:
+            commits = sorted(repo.iter_commits(), key=lambda commit: repo.graph.generation(commit.id))
+            repo.blobs.unpack()
+            self._get_journal(repo.name).compact(commits)
+            repo.commits = LinkedList()
+            for commit in commits:
+                repo.commits.append(commit)
+            
+            repo.storage = "json"
+            _write_json_atomic(self._get_repo_file_path(repo.name), repo.to_dict(include_commits=False),
+                               self.codec)
+            repo.snapshot_stamp = self._snapshot_stamp(repo.name)
+            repo.attach_pack(None)
+            for path in self._get_pack_paths(repo.name):
+                os.remove(path)
+    
+    def _load_repository(self, repo: Repository, records: Optional[List[Dict]] = None) -> Repository:
+        """Completa un repositorio leído de su snapshot con su diario de
+        commits (o con sus registros, si ya se leyeron)"""
+        journal = self._get_journal(repo.name)
+        # Los commits que ya trae el snapshot son del formato antiguo
+        legacy_commits = not repo.commits.is_empty()
+        
+        if repo.storage == "pack":
+            repo.attach_pack(PackReader(*self._get_pack_paths(repo.name)))
+        
+        # Reproducir el diario sobre los commits del snapshot, un registro a la vez
+        journal_ids = set()
+        for commit_data in (journal.read() if records is None else records):
+            journal_ids.add(commit_data["id"])
+            if commit_data["id"] in repo._commit_index or (repo.pack and commit_data["id"] in repo.pack):
+                continue
+            repo.add_commit(repo.commit_from_dict(commit_data))
+        
+        # Migrar al diario los commits guardados en el formato antiguo
+        if legacy_commits:
+            # Sin generación guardada, el primer `log -n` calcularía la de
+            # todo el historial antes de mostrar nada: se calculan aquí, una
+            # sola vez, y quedan escritas en el diario
+            for commit in repo.commits.to_list():
+                repo.graph.generation(commit.id)
+            repo.pending_commits = [commit for commit in repo.commits.to_list()
+                                    if commit.id not in journal_ids]
+            self._dirty_repos.add(repo.name)
+        
+        if journal.needs_compaction():
+            journal.compact([commit for commit in repo.commits.to_list()
+                             if repo.pack is None or commit.id not in repo.pack])
+        
+        return repo
+    
     def _load_data(self):
-        """Carga los datos del sistema desde archivos JSON"""
+        """Carga el índice de repositorios; cada repositorio se lee al usarlo por primera vez"""
         # Cargar índice de repositorios
-        if os.path.exists(REPOS_FILE):
-            try:
-                with open(REPOS_FILE, 'r') as f:
-                    repos_index = json.load(f)
-                    
-                    # Cargar cada repositorio
-                    for repo_name in repos_index:
-                        repo_file = self._get_repo_file_path(repo_name)
-                        if os.path.exists(repo_file):
-                            with open(repo_file, 'r') as repo_f:
-                                repo_data = json.load(repo_f)
-                                self.repositories.append(Repository.from_dict(repo_data))
-            except Exception as e:
-                print(f"Error al cargar los datos: {e}")
+        with self._lock, self._data_lock:
+            if os.path.exists(REPOS_FILE):
+                try:
+                    self._merge_index()
+                except (OSError, ValueError) as e:
+                    print(f"Error al cargar los datos: {e}")
+            else:
+                # Crear un índice vacío
+                _write_json_atomic(REPOS_FILE, [], self.codec)
+    
+    def _merge_index(self):
+        """Añade los repositorios del índice en disco que no se conocen, como
+        los creados por otro proceso"""
+        with open(REPOS_FILE, 'rb') as f:
+            repos_index = self.codec.loads(f.read())
+        for repo_name in repos_index:
+            if repo_name not in self._repository_names \
+                    and os.path.exists(self._get_repo_file_path(repo_name)):
+                self.repositories.append(repo_name)
+                self._repository_names.add(repo_name)
+    
+    def _read_repository(self, name: str) -> Optional[Repository]:
+        """Lee de disco un repositorio del índice"""
+        try:
+            with self._data_lock:
+                return self._build_repository(name, self._read_repository_file(name))
+        except Exception as e:
+            print(f"Error al cargar el repositorio '{name}': {e}")
+            return None
+    
+    def _read_repository_file(self, name: str) -> Optional[bytes]:
+        """Lee el archivo de un repositorio, o retorna None si es grande y
+        debe leerse por partes"""
+        path = self._get_repo_file_path(name)
+        if os.path.getsize(path) >= STREAM_MIN_SIZE:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+    
+    def _build_repository(self, name: str, data, records: Optional[List[Dict]] = None) -> Repository:
+        """Construye un repositorio a partir de su archivo ya leído (bytes o
+        diccionario decodificado; None: leerlo por partes) y de su diario"""
+        # Quien llama tiene el candado de data/
+        blobs = self._get_blob_store(name)
+        stamp = self._snapshot_stamp(name)
+        if data is None:
+            # Los archivos grandes se leen por partes en lugar de cargar todo el texto
+            with open(self._get_repo_file_path(name), 'r', encoding='utf-8') as f:
+                repo = Repository.from_stream(JsonStreamReader(f), blobs)
         else:
-            # Crear un índice vacío
-            with open(REPOS_FILE, 'w') as f:
-                json.dump([], f)
+            if isinstance(data, bytes):
+                data = self.codec.loads(data)
+            repo = Repository.from_dict(data, blobs)
+        repo.snapshot_stamp = stamp
+        return self._load_repository(repo, records)
+    
+    def load_repositories(self, names: Optional[List[str]] = None) -> Dict[str, str]:
+        """Carga varios repositorios a la vez (por defecto, todos los del índice).
+
+        Los archivos se leen en un pool de `workers` hilos. El snapshot y
+        el diario de cada repositorio se decodifican en `decode_processes`
+        procesos, o en los mismos hilos, que entonces construyen el
+        repositorio completo. Un repositorio que no se puede leer no impide
+        cargar los demás: retorna el error de cada uno, en el orden de `names`.
+
+        Si son más de `max_loaded_repositories` solo se cargan los primeros,
+        porque el resto se descartaría enseguida; los omitidos se informan y
+        también se retornan.
+        """
+        with self._lock:
+            if names is None:
+                names = self.repositories.to_list()
+            names = [name for name in names
+                     if name in self._repository_names and name not in self._loaded]
+        skipped = []
+        if self.max_loaded_repositories is not None:
+            names, skipped = names[:self.max_loaded_repositories], names[self.max_loaded_repositories:]
+        errors = OrderedDict()
+        repos = []
+        
+        with contextlib.ExitStack() as stack:
+            threads = stack.enter_context(ThreadPoolExecutor(self.workers))
+            decoder = None
+            if self.decode_processes > 0:
+                decoder = stack.enter_context(ProcessPoolExecutor(
+                    self.decode_processes, mp_context=multiprocessing.get_context("spawn")))
+            
+            with self._data_lock:
+                reads = [threads.submit(self._read_repository_file, name) for name in names]
+                builds = []
+                for name, read in zip(names, reads):
+                    try:
+                        data = read.result()
+                    except Exception as e:
+                        errors[name] = e
+                        builds.append(None)
+                        continue
+                    if decoder is None:
+                        builds.append(threads.submit(self._build_repository, name, data))
+                    else:
+                        builds.append(decoder.submit(_decode_repository, data, self.codec.name,
+                                                     self._get_journal(name).path))
+                
+                # Los repositorios se completan en orden; con procesos, aquí solo
+                # se construyen los objetos a partir de lo ya decodificado
+                for name, build in zip(names, builds):
+                    if name in errors:
+                        continue
+                    try:
+                        if decoder is None:
+                            repos.append(build.result())
+                        else:
+                            data, journal, records = build.result()
+                            self._journals[name] = journal
+                            repos.append(self._build_repository(name, data, records))
+                    except Exception as e:
+                        errors[name] = e
+        
+        with self._lock:
+            for repo in repos:
+                # Otro hilo pudo cargarlo mientras tanto
+                self._loaded.setdefault(repo.name, repo)
+            self._evict_repositories()
+        
+        for name in names:
+            if name in errors:
+                print(f"Error al cargar el repositorio '{name}': {errors[name]}")
+        result = OrderedDict((name, str(errors[name])) for name in names if name in errors)
+        if skipped:
+            reason = f"No se cargó: el límite es de {self.max_loaded_repositories} repositorios en memoria"
+            print(f"No se cargaron {len(skipped)} repositorios por el límite de "
+                  f"{self.max_loaded_repositories} en memoria: {', '.join(skipped)}")
+            result.update((name, reason) for name in skipped)
+        return result
+    
+    def _refresh_repository(self, name: str):
+        """Vuelve a leer un repositorio cargado si otro proceso guardó su
+        snapshot después de leerlo este, para no trabajar sobre una copia
+        vieja. Quien llama tiene su candado de lectura o escritura.
+
+        Con cambios sin guardar no se lee: el guardado detecta el conflicto
+        y los rechaza. La rama actual y el staging de fuera de sesión son de
+        este proceso y se conservan.
+        """
+        with self._lock:
+            repo = self._loaded.get(name)
+            if repo is None or name in self._dirty_repos:
+                return
+            with self._data_lock:
+                if self._snapshot_stamp(name) == repo.snapshot_stamp:
+                    return
+                fresh = self._read_repository(name)
+            if fresh is None:
+                return
+            if repo._current_branch in fresh.branches:
+                fresh._current_branch = repo._current_branch
+            fresh._workspace.staging_area = repo._workspace.staging_area
+            fresh._workspace.staged_names = repo._workspace.staged_names
+            self._loaded[name] = fresh
+            if self._current_repository is repo:
+                self._current_repository = fresh
+    
+    def _evict_repositories(self):
+        """Descarga los repositorios menos usados si se supera el límite en memoria"""
+        if self.max_loaded_repositories is None:
+            return
+        
+        with self._lock:
+            # El último es el recién usado y nunca se descarta
+            current_name = self._current_repository_name()
+            for name in list(self._loaded)[:-1]:
+                if len(self._loaded) <= self.max_loaded_repositories:
+                    break
+                if name == current_name or self._in_use.get(name):
+                    continue
+                # Sin esperar: si otro hilo lo está usando, se descarta otro
+                lock = self._get_repo_lock(name)
+                if not lock.acquire_write(blocking=False):
+                    continue
+                try:
+                    # Guardar antes de descartar para no perder cambios
+                    if name in self._dirty_repos:
+                        self._save_repository(self._loaded[name])
+                    del self._loaded[name]
+                    self._journals.pop(name, None)
+                finally:
+                    lock.release_write()
+    
+    def _mark_dirty(self, repo: Optional[Repository] = None):
+        """Marca un repositorio (por defecto el actual) como pendiente de guardar"""
+        repo = repo or self.current_repository
+        if repo:
+            self._dirty_repos.add(repo.name)
+    
+    def _save_repository(self, repo: Repository):
+        """Escribe en disco un repositorio modificado"""
+        # Quien llama tiene el candado de escritura del repositorio
+        with self._data_lock:
+            self._write_repository(repo)
+    
+    def _write_repository(self, repo: Repository):
+        """Escribe los archivos de un repositorio; quien llama tiene su
+        candado de escritura y el de data/"""
+        journal = self._get_journal(repo.name)
+        self._dirty_repos.discard(repo.name)
+        if self._snapshot_stamp(repo.name) != repo.snapshot_stamp:
+            # Otro proceso lo guardó después de leerlo este: escribir encima
+            # perdería sus cambios. Se descartan los de aquí y el próximo
+            # comando vuelve a leerlo (ver _refresh_repository)
+            repo.pending_commits = []
+            raise RuntimeError(f"Otro proceso modificó el repositorio '{repo.name}'; "
+                               f"los cambios sin guardar se descartaron, vuelva a intentarlo.")
+        try:
+            # Primero los contenidos, luego los commits nuevos al diario y por
+            # último el snapshot mutable, para no dejar referencias colgantes
+            repo.blobs.flush()
+            journal.append(repo.pending_commits)
+            repo.pending_commits = []
+            if journal.waste_ratio() > JOURNAL_MAX_WASTE_RATIO:
+                # Anexados repetidos tras guardados fallidos: al cargar se
+                # compacta siempre, pero un proceso largo no vuelve a cargar
+                journal.compact(repo.commits.to_list())
+            _write_json_atomic(self._get_repo_file_path(repo.name),
+                               repo.to_dict(include_commits=False), self.codec)
+            repo.snapshot_stamp = self._snapshot_stamp(repo.name)
+        except BaseException:
+            self._dirty_repos.add(repo.name)  # Sigue pendiente para el próximo guardado
+            raise
+    
+    def _autosave(self):
+        """Guarda los cambios de un comando, salvo que el guardado esté diferido.
+
+        Solo se escriben el índice y el repositorio actual, cuyo candado ya
+        tiene el comando en curso. Con escritura diferida solo se avisa al
+        hilo que guarda.
+        """
+        if not self.autosave:
+            return
+        if self._flusher is not None:
+            self._flusher.notify()
+            return
+        # El archivo del repositorio antes que el índice: otro proceso que
+        # mezcle el índice ignora los nombres cuyo archivo aún no existe
+        repo = self.current_repository
+        if repo is not None and repo.name in self._dirty_repos:
+            self._save_repository(repo)
+        self._save_index()
+    
+    def _save_index(self):
+        """Guarda el índice de repositorios si cambió, sin perder los que
+        haya añadido otro proceso"""
+        with self._lock:
+            if not self._index_dirty:
+                return
+            with self._data_lock:
+                if os.path.exists(REPOS_FILE):
+                    self._merge_index()
+                _write_json_atomic(REPOS_FILE, self.repositories.to_list(), self.codec)
+            self._index_dirty = False
     
     def _save_data(self):
-        """Guarda los datos del sistema en archivos JSON"""
-        # Guardar índice de repositorios
-        repos_names = [repo.name for repo in self.repositories.to_list()]
-        with open(REPOS_FILE, 'w') as f:
-            json.dump(repos_names, f, indent=2)
-        
-        # Guardar cada repositorio en su propio archivo
-        for repo in self.repositories.to_list():
-            repo_file = self._get_repo_file_path(repo.name)
-            with open(repo_file, 'w') as f:
-                json.dump(repo.to_dict(), f, indent=2)
+        """Guarda en disco solo los repositorios modificados desde el último guardado.
+
+        Toma el candado de escritura de cada repositorio, así que no debe
+        llamarse desde un comando que tenga el de otro repositorio. Con
+        varios repositorios pendientes y `workers` > 1 se escriben en
+        paralelo. Si alguno falla se guardan igual los demás, se informan
+        los errores en orden de nombre y se lanza el primero.
+        """
+        # En orden de nombre, para que dos guardados simultáneos tomen los
+        # candados en el mismo orden
+        repo_names = sorted(self._dirty_repos)
+        errors = OrderedDict()
+        if self.workers > 1 and len(repo_names) > 1:
+            self._save_repositories_parallel(repo_names, errors)
+        else:
+            # Guardar cada repositorio modificado en su propio archivo
+            for repo_name in repo_names:
+                with self._get_repo_lock(repo_name).write():
+                    # Se busca con el candado tomado: si se descargó y se volvió a
+                    # cargar, hay que guardar el objeto nuevo, no uno anterior
+                    with self._lock:
+                        repo = self._loaded.get(repo_name)
+                    if repo is None:
+                        # Quien lo descargó ya lo guardó
+                        self._dirty_repos.discard(repo_name)
+                        continue
+                    if repo_name in self._dirty_repos:
+                        try:
+                            self._save_repository(repo)
+                        except Exception as e:
+                            errors[repo_name] = e
+        
+        # Guardar índice de repositorios solo si cambió (después de los
+        # archivos de los repositorios nuevos)
+        self._save_index()
+        
+        for repo_name, error in errors.items():
+            print(f"Error al guardar el repositorio '{repo_name}': {error}", file=sys.stderr)
+        if errors:
+            raise next(iter(errors.values()))
+    
+    def _save_repositories_parallel(self, repo_names: List[str], errors: Dict[str, Exception]):
+        """Escribe varios repositorios en un pool de hilos.
+
+        Toma primero los candados de escritura de todos y después el de
+        data/, una sola vez para todo el grupo.
+        """
+        locks = []
+        repos = []
+        try:
+            for repo_name in repo_names:
+                lock = self._get_repo_lock(repo_name)
+                lock.acquire_write()
+                locks.append(lock)
+                with self._lock:
+                    repo = self._loaded.get(repo_name)
+                if repo is None:
+                    self._dirty_repos.discard(repo_name)
+                elif repo_name in self._dirty_repos:
+                    repos.append(repo)
+            
+            with self._data_lock, ThreadPoolExecutor(min(self.workers, len(repos) or 1)) as threads:
+                writes = [threads.submit(self._write_repository, repo) for repo in repos]
+                for repo, write in zip(repos, writes):
+                    try:
+                        write.result()
+                    except Exception as e:
+                        errors[repo.name] = e
+        finally:
+            for lock in locks:
+                lock.release_write()
+    
+    def start_write_behind(self, interval_ms: int = FLUSH_INTERVAL_MS,
+                           max_operations: int = FLUSH_MAX_OPERATIONS):
+        """Activa la escritura diferida: los comandos marcan sus cambios y un
+        hilo los guarda juntos cada `interval_ms` o cada `max_operations` cambios"""
+        if self._flusher is None:
+            self._flusher = WriteBehindFlusher(self._save_data, interval_ms / 1000, max_operations)
+            self._flusher.start()
+    
+    def stop_write_behind(self):
+        """Guarda lo pendiente y vuelve a guardar tras cada comando"""
+        if self._flusher is not None:
+            self._flusher.stop()
+            self._flusher = None
+        self._save_data()
+    
+    def flush(self):
+        """Guarda ya en disco todos los cambios pendientes"""
+        self._save_data()
     
     def get_repository(self, name: str) -> Optional[Repository]:
-        """Obtiene un repositorio por su nombre"""
-        current = self.repositories.head
-        while current:
-            if current.data.name == name:
-                return current.data
-            current = current.next
-        return None
+        """Obtiene un repositorio por su nombre, cargándolo de disco si hace falta"""
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                return self._loaded[name]
+            
+            if name not in self._repository_names:
+                return None
+            
+            repo = self._read_repository(name)
+            if repo:
+                self._loaded[name] = repo
+                self._evict_repositories()
+            return repo
     
     def create_repository(self, name: str, path: str) -> Repository:
         """Crea un nuevo repositorio"""
-        # Verificar si ya existe un repositorio con ese nombre
-        if self.get_repository(name):
-            raise ValueError(f"Ya existe un repositorio con el nombre '{name}'")
-        
-        # Crear el repositorio
-        repo = Repository(name, path)
-        self.repositories.append(repo)
-        self.current_repository = repo
-        
-        # Guardar los datos
-        self._save_data()
+        with self._lock:
+            # Verificar si ya existe un repositorio con ese nombre
+            if self.get_repository(name):
+                raise ValueError(f"Ya existe un repositorio con el nombre '{name}'")
+            
+            # Crear el repositorio
+            repo = Repository(name, path, self._get_blob_store(name))
+            self.repositories.append(name)
+            self._repository_names.add(name)
+            self._loaded[name] = repo
+            with self._data_lock:
+                self._get_journal(name).compact([])
+            self.current_repository = repo
+            
+            # Guardar los datos
+            self._index_dirty = True
+            self._mark_dirty(repo)
+            self._autosave()
+            self._evict_repositories()
         
         return repo
     
@@ -676,12 +3438,13 @@ class GitSystem:
         repo = self.get_repository(name)
         if repo:
             self.current_repository = repo
+            self._evict_repositories()
             return True
         return False
     
     def list_repositories(self) -> List[str]:
         """Lista los nombres de todos los repositorios"""
-        return [repo.name for repo in self.repositories.to_list()]
+        return self.repositories.to_list()
     
     def set_user_email(self, email: str):
         """Establece el email del usuario"""
@@ -690,7 +3453,37 @@ class GitSystem:
         self.user_email = email
     
     def execute_command(self, command: str, args: List[str]) -> Any:
-        """Ejecuta un comando Git"""
+        """Ejecuta un comando Git.
+
+        Los comandos de consulta toman el candado de lectura del repositorio
+        actual y el resto el de escritura, así que comandos de distintas
+        sesiones sobre el mismo repositorio no se mezclan.
+        """
+        with self._lock:
+            name = self._current_repository_name() if command != "init" else None
+            if name is None or self.get_repository(name) is None:
+                # init y los errores por falta de repositorio no tocan ninguno
+                return self._run_command(command, args)
+            lock = self._get_repo_lock(name)
+            self._in_use[name] = self._in_use.get(name, 0) + 1
+        
+        read_only = command in self.READ_ONLY_COMMANDS or \
+            (command == "pr" and bool(args) and args[0] in self.READ_ONLY_PR_COMMANDS)
+        try:
+            with (lock.read() if read_only else lock.write()), contextlib.ExitStack() as stack:
+                if not read_only and self.autosave and self._flusher is None:
+                    # Leer, modificar y guardar sin que otro proceso guarde en medio
+                    stack.enter_context(self._get_repo_file_lock(name))
+                self._refresh_repository(name)
+                return self._run_command(command, args)
+        finally:
+            with self._lock:
+                self._in_use[name] -= 1
+                if not self._in_use[name]:
+                    del self._in_use[name]
+    
+    def _run_command(self, command: str, args: List[str]) -> Any:
+        """Interpreta un comando con el candado que corresponda ya tomado"""
         # Comandos que no requieren un repositorio actual
         if command == "init":
             if len(args) < 1:
@@ -710,17 +3503,44 @@ class GitSystem:
         if command == "status":
             return self._git_status()
         elif command == "log":
-            return self._git_log()
+            limit, since = None, None
+            try:
+                i = 0
+                while i < len(args):
+                    if args[i] == "-n":
+                        limit = int(args[i + 1])
+                        i += 1
+                    elif args[i].startswith("--since="):
+                        since = _parse_timestamp(args[i].split("=", 1)[1])
+                    elif args[i] == "--since":
+                        since = _parse_timestamp(args[i + 1])
+                        i += 1
+                    else:
+                        raise ValueError(args[i])
+                    i += 1
+            except (IndexError, ValueError):
+                print("Uso: git log [-n <cantidad>] [--since AAAA-MM-DD]")
+                return None
+            return self._git_log(limit, since)
         elif command == "add":
             if len(args) < 1:
-                print("Uso: git add <archivo>")
+                print("Uso: git add <archivo|patrón>...")
                 return None
-            return self._git_add(args[0])
+            return self._git_add(args)
         elif command == "commit":
             if len(args) < 2 or args[0] != "-m":
                 print("Uso: git commit -m \"<mensaje>\"")
                 return None
             return self._git_commit(args[1])
+        elif command == "diff":
+            if len(args) > 2:
+                print("Uso: git diff [<commit> [<commit>]]")
+                return None
+            return self._git_diff(*args)
+        elif command == "pack":
+            return self._git_pack()
+        elif command == "unpack":
+            return self._git_unpack()
         elif command == "checkout":
             if len(args) < 1:
                 print("Uso: git checkout <rama_o_commit>")
@@ -729,7 +3549,7 @@ class GitSystem:
         elif command == "branch":
             if len(args) < 1:
                 # Listar ramas
-                return [branch.name for branch in self.current_repository.branches]
+                return list(self.current_repository.branches)
             # Crear rama
             return self._git_branch(args[0])
         elif command == "pr":
@@ -740,16 +3560,16 @@ class GitSystem:
             subcommand = args[0]
             if subcommand == "create":
                 if len(args) < 3:
-                    print("Uso: git pr create <rama_origen> <rama_destino>")
+                    print("Uso: git pr create <rama_origen> <rama_destino> [título [descripción]]")
                     return None
-                return self._git_pr_create(args[1], args[2])
+                return self._git_pr_create(args[1], args[2], *args[3:5])
             elif subcommand == "status":
                 return self._git_pr_status()
             elif subcommand == "review":
                 if len(args) < 2:
-                    print("Uso: git pr review <id_pr>")
+                    print("Uso: git pr review <id_pr> [revisor]")
                     return None
-                return self._git_pr_review(args[1])
+                return self._git_pr_review(*args[1:3])
             elif subcommand == "approve":
                 if len(args) < 2:
                     print("Uso: git pr approve <id_pr>")
@@ -760,6 +3580,11 @@ class GitSystem:
                     print("Uso: git pr reject <id_pr>")
                     return None
                 return self._git_pr_reject(args[1])
+            elif subcommand == "merge":
+                if len(args) < 2:
+                    print("Uso: git pr merge <id_pr>")
+                    return None
+                return self._git_pr_merge(args[1])
             elif subcommand == "cancel":
                 if len(args) < 2:
                     print("Uso: git pr cancel <id_pr>")
@@ -787,20 +3612,9 @@ class GitSystem:
         """Implementa el comando git status"""
         repo = self.current_repository
         
-        # Obtener archivos en el área de staging
-        staged_files = repo.staging_area.to_list()
-        
-        # Obtener información de la rama actual
-        current_branch = repo.get_current_branch()
-        
-        status = {
-            "branch": repo.current_branch,
-            "staged_files": [file.name for file in staged_files],
-            "modified_files": [name for name, file in repo.files.items() 
-                              if file.status == "M" and file not in staged_files],
-            "untracked_files": [name for name, file in repo.files.items() 
-                               if file.status == "A" and file not in staged_files]
-        }
+        status = {"branch": repo.current_branch}
+        status.update(repo.get_status())
+        staged_files = [repo.files[name] for name in status["staged_files"]]
         
         # Mostrar información de forma simplificada
         print(f"En rama: {status['branch']}")
@@ -827,45 +3641,132 @@ class GitSystem:
         
         return status
     
-    def _git_log(self) -> List[Dict]:
-        """Implementa el comando git log"""
-        commits = self.current_repository.commits.to_list()
-        
-        if not commits:
-            print("No hay commits en este repositorio.")
-            return []
-        
-        # Mostrar información de forma simplificada
-        print("Historial de commits:")
-        for commit in commits:
+    def _git_log(self, limit: Optional[int] = None, since=None) -> List[Dict]:
+        """Implementa el comando git log.
+
+        Recorre la rama actual de forma perezosa, así que mostrar los
+        últimos `limit` commits cuesta `limit` búsquedas sin importar el
+        tamaño del historial. `since` es una fecha ISO (AAAA-MM-DD) o una
+        marca de tiempo.
+        """
+        repo = self.current_repository
+        if since is not None:
+            since = _parse_timestamp(since)
+            # Por fecha: el orden por generación puede mostrar un commit viejo
+            # de una rama fusionada antes que otros más nuevos
+            branch = repo.get_current_branch()
+            history = repo.graph.walk_by_date([branch.head_commit_id if branch else None])
+        else:
+            history = repo.iter_history()
+        shown = []
+        for commit in history:
+            if limit is not None and len(shown) >= limit:
+                break
+            # Lo que queda por recorrer es más viejo: se puede cortar
+            if since is not None and commit.timestamp < since:
+                break
+            
+            if not shown:
+                print("Historial de commits:")
+            # Mostrar información de forma simplificada
             print(f"Commit: {commit.id}")
             print(f"Autor: {commit.author_email}")
-            print(f"Fecha: {commit.timestamp.split('T')[0]}")
+            print(f"Fecha: {_format_date(commit.timestamp)}")
             print(f"Mensaje: {commit.message}")
             if commit.parent_id:
                 print(f"Padre: {commit.parent_id}")
-            print("-" * 40)
+            print("-" * 40, flush=True)
+            shown.append(commit.to_dict())
         
-        return [commit.to_dict() for commit in commits]
+        if not shown:
+            print("No hay commits en este repositorio.")
+        return shown
     
-    def _git_add(self, file_path: str) -> bool:
-        """Implementa el comando git add"""
+    def _git_diff(self, old_ref: Optional[str] = None, new_ref: Optional[str] = None) -> Optional[List[Dict]]:
+        """Implementa el comando git diff.
+
+        Sin argumentos compara el head con los cambios sin confirmar; con un
+        commit lo compara con el head; con dos, compara el primero con el segundo.
+        """
         repo = self.current_repository
         
-        # Verificar si el archivo ya existe en el repositorio
-        if file_path in repo.files:
-            file = repo.files[file_path]
+        if old_ref is None:
+            result = repo.diff_working_tree()
         else:
-            # Crear un nuevo archivo (simulado)
-            file = File(file_path, f"Contenido simulado para {file_path}")
+            old_commit = repo.resolve_revision(old_ref)
+            if not old_commit:
+                print(f"El commit '{old_ref}' no existe.")
+                return None
+            if new_ref is None:
+                new_commit = repo.get_commit_by_id(repo.get_current_branch().head_commit_id or "")
+            else:
+                new_commit = repo.resolve_revision(new_ref)
+                if not new_commit:
+                    print(f"El commit '{new_ref}' no existe.")
+                    return None
+            result = repo.diff_trees(repo.get_snapshot(old_commit.id),
+                                     repo.get_snapshot(new_commit.id if new_commit else None))
+        
+        _print_diff(result)
+        return result
+    
+    def _git_pack(self) -> bool:
+        """Implementa el comando git pack"""
+        repo = self.current_repository
+        self._pack_repository(repo)
+        print(f"Repositorio '{repo.name}' empaquetado ({repo.pack.count} objetos).")
+        return True
+    
+    def _git_unpack(self) -> bool:
+        """Implementa el comando git unpack"""
+        repo = self.current_repository
+        if repo.storage != "pack":
+            print(f"El repositorio '{repo.name}' no está empaquetado.")
+            return False
+        self._unpack_repository(repo)
+        print(f"Repositorio '{repo.name}' guardado de nuevo como JSON.")
+        return True
+    
+    def _git_add(self, file_paths: List[str]) -> bool:
+        """Implementa el comando git add.
+
+        Acepta varios archivos y patrones (*, ?, []) que se buscan entre
+        los archivos del repositorio. Los checksums de los archivos nuevos
+        se calculan juntos, en paralelo si son grandes; los que ya están en
+        el repositorio no se vuelven a hashear.
+        """
+        repo = self.current_repository
         
-        # Añadir el archivo al área de staging
-        repo.add_file_to_staging(file)
+        # Expandir los patrones, sin repetir archivos
+        paths = OrderedDict()
+        for file_path in file_paths:
+            if any(char in file_path for char in "*?["):
+                matches = fnmatch.filter(repo.files, file_path)
+                if not matches:
+                    print(f"El patrón '{file_path}' no coincide con ningún archivo.")
+                    return False
+                paths.update((match, None) for match in matches)
+            else:
+                paths[file_path] = None
+        
+        # Crear los archivos nuevos (simulados) con sus checksums
+        new_paths = [path for path in paths if path not in repo.files]
+        contents = [f"Contenido simulado para {path}" for path in new_paths]
+        new_files = {path: File(path, content, checksum=checksum) for path, content, checksum
+                     in zip(new_paths, contents, hash_contents(contents, self.workers))}
+        
+        # Añadir los archivos al área de staging
+        for path in paths:
+            repo.add_file_to_staging(repo.files[path] if path in repo.files else new_files[path])
         
         # Guardar los datos
-        self._save_data()
+        self._mark_dirty()
+        self._autosave()
         
-        print(f"Archivo '{file_path}' añadido al área de staging.")
+        if len(paths) == 1:
+            print(f"Archivo '{next(iter(paths))}' añadido al área de staging.")
+        else:
+            print(f"{len(paths)} archivos añadidos al área de staging.")
         return True
     
     def _git_commit(self, message: str) -> Optional[Dict]:
@@ -878,7 +3779,8 @@ class GitSystem:
             return None
         
         # Guardar los datos
-        self._save_data()
+        self._mark_dirty()
+        self._autosave()
         
         print(f"Commit creado: {commit.id}")
         print(f"Mensaje: {commit.message}")
@@ -903,7 +3805,8 @@ class GitSystem:
         
         # Guardar los datos
         if result:
-            self._save_data()
+            self._mark_dirty()
+            self._autosave()
         
         return result
     
@@ -913,18 +3816,25 @@ class GitSystem:
         
         # Guardar los datos
         if result:
-            self._save_data()
+            self._mark_dirty()
+            self._autosave()
             print(f"Rama '{branch_name}' creada.")
         
         return result
     
-    def _git_pr_create(self, source_branch: str, target_branch: str) -> Optional[Dict]:
+    def _git_pr_create(self, source_branch: str, target_branch: str,
+                       title: Optional[str] = None, description: Optional[str] = None) -> Optional[Dict]:
         """Implementa el comando git pr create"""
         repo = self.current_repository
         
-        # Solicitar título y descripción
-        title = input("Título del Pull Request: ")
-        description = input("Descripción del Pull Request: ")
+        # Solicitar título y descripción si no vienen como argumentos
+        if title is None:
+            if not self.interactive:
+                print("Uso: git pr create <rama_origen> <rama_destino> <título> [descripción]")
+                return None
+            title = input("Título del Pull Request: ")
+        if description is None:
+            description = input("Descripción del Pull Request: ") if self.interactive else ""
         
         # Crear el pull request
         pr = repo.create_pull_request(title, description, self.user_email, 
@@ -932,7 +3842,8 @@ class GitSystem:
         
         # Guardar los datos
         if pr:
-            self._save_data()
+            self._mark_dirty()
+            self._autosave()
             print(f"Pull Request creado: {pr.id}")
             print(f"Título: {pr.title}")
             print(f"De '{pr.source_branch}' a '{pr.target_branch}'")
@@ -942,20 +3853,11 @@ class GitSystem:
     
     def _git_pr_status(self) -> Dict:
         """Implementa el comando git pr status"""
-        prs = self.current_repository.pull_requests.to_list()
+        prs = self.current_repository.pull_requests
         
-        # Agrupar por estado
-        result = {
-            "pending": [],
-            "reviewing": [],
-            "approved": [],
-            "merged": [],
-            "rejected": []
-        }
-        
-        for pr in prs:
-            if pr.status in result:
-                result[pr.status].append(pr.id)
+        # Agrupar por estado usando los índices de la cola
+        result = {status: [pr.id for pr in prs.by_status(status)]
+                  for status in PullRequest.VALID_STATUSES}
         
         # Mostrar información de forma simplificada
         print("Estado de Pull Requests:")
@@ -968,15 +3870,31 @@ class GitSystem:
         
         return result
     
-    def _git_pr_review(self, pr_id: str) -> bool:
+    def _git_pr_review(self, pr_id: str, reviewer: Optional[str] = None) -> bool:
         """Implementa el comando git pr review"""
-        reviewer = input("Nombre del revisor: ")
-        result = self.current_repository.review_pull_request(pr_id, reviewer)
+        if reviewer is None:
+            if not self.interactive:
+                print("Uso: git pr review <id_pr> <revisor>")
+                return False
+            reviewer = input("Nombre del revisor: ")
+        repo = self.current_repository
+        result = repo.review_pull_request(pr_id, reviewer)
         
         # Guardar los datos
         if result:
-            self._save_data()
+            self._mark_dirty()
+            self._autosave()
             print(f"Pull Request {pr_id} en revisión por {reviewer}.")
+            
+            # Mostrar los cambios del PR respecto a la base común con el destino
+            pr = repo.pull_requests.get(pr_id)
+            source = repo.get_branch(pr.source_branch)
+            target = repo.get_branch(pr.target_branch)
+            if source and target and source.head_commit_id:
+                base_id = repo.graph.merge_base(target.head_commit_id, source.head_commit_id) \
+                    if target.head_commit_id else None
+                _print_diff(repo.diff_trees(repo.get_snapshot(base_id),
+                                            repo.get_snapshot(source.head_commit_id)))
         
         return result
     
@@ -986,7 +3904,8 @@ class GitSystem:
         
         # Guardar los datos
         if result:
-            self._save_data()
+            self._mark_dirty()
+            self._autosave()
             print(f"Pull Request {pr_id} aprobado.")
         
         return result
@@ -997,15 +3916,35 @@ class GitSystem:
         
         # Guardar los datos
         if result:
-            self._save_data()
+            self._mark_dirty()
+            self._autosave()
             print(f"Pull Request {pr_id} rechazado.")
         
         return result
     
+    def _git_pr_merge(self, pr_id: str) -> bool:
+        """Implementa el comando git pr merge"""
+        repo = self.current_repository
+        result = repo.merge_pull_request(pr_id, self.user_email)
+        
+        # Guardar los datos
+        if result:
+            self._mark_dirty()
+            self._autosave()
+            pr = repo.pull_requests.get(pr_id)
+            head = repo.get_commit_by_id(repo.get_branch(pr.target_branch).head_commit_id)
+            print(f"Pull Request {pr_id} fusionado en '{pr.target_branch}'.")
+            if head and head.conflicts:
+                print("Conflictos marcados en:")
+                for conflict in head.conflicts:
+                    print(f"  {conflict['path']} ({conflict['type']})")
+        
+        return result
+    
     def _git_pr_cancel(self, pr_id: str) -> bool:
         """Implementa el comando git pr cancel"""
         # Buscar el PR en la cola
-        pr = self.current_repository.pull_requests.find("id", pr_id)
+        pr = self.current_repository.pull_requests.get(pr_id)
         if not pr:
             print(f"El pull request '{pr_id}' no existe.")
             return False
@@ -1014,7 +3953,8 @@ class GitSystem:
         pr.update_status("rejected")
         
         # Guardar los datos
-        self._save_data()
+        self._mark_dirty()
+        self._autosave()
         
         print(f"Pull Request {pr_id} cancelado.")
         return True
@@ -1041,23 +3981,23 @@ class GitSystem:
     def _git_pr_next(self) -> Optional[Dict]:
         """Implementa el comando git pr next"""
         # Obtener el siguiente PR pendiente
-        prs = self.current_repository.pull_requests.to_list()
-        for pr in prs:
-            if pr.status == "pending":
-                pr.update_status("reviewing")
-                
-                # Guardar los datos
-                self._save_data()
-                
-                print(f"Procesando Pull Request {pr.id}: {pr.title}")
-                return {"id": pr.id, "title": pr.title}
+        pr = self.current_repository.pull_requests.next_with_status("pending")
+        if pr:
+            pr.update_status("reviewing")
+            
+            # Guardar los datos
+            self._mark_dirty()
+            self._autosave()
+            
+            print(f"Procesando Pull Request {pr.id}: {pr.title}")
+            return {"id": pr.id, "title": pr.title}
         
         print("No hay pull requests pendientes.")
         return None
     
     def _git_pr_tag(self, pr_id: str, tag: str) -> bool:
         """Implementa el comando git pr tag"""
-        pr = self.current_repository.pull_requests.find("id", pr_id)
+        pr = self.current_repository.pull_requests.get(pr_id)
         if not pr:
             print(f"El pull request '{pr_id}' no existe.")
             return False
@@ -1065,7 +4005,8 @@ class GitSystem:
         pr.add_tag(tag)
         
         # Guardar los datos
-        self._save_data()
+        self._mark_dirty()
+        self._autosave()
         
         print(f"Etiqueta '{tag}' añadida al Pull Request {pr_id}.")
         return True
@@ -1073,17 +4014,208 @@ class GitSystem:
     def _git_pr_clear(self) -> bool:
         """Implementa el comando git pr clear"""
         # Implementación simplificada: crear una nueva cola vacía
-        self.current_repository.pull_requests = Queue()
+        self.current_repository.pull_requests = PullRequestQueue()
         
         # Guardar los datos
-        self._save_data()
+        self._mark_dirty()
+        self._autosave()
         
         print("Todos los pull requests han sido eliminados.")
         return True
 
-def main():
+def execute_line(git_system: GitSystem, parts: List[str]) -> Any:
+    """Ejecuta un comando ya separado en palabras, incluidos los comandos
+    especiales del sistema (repos, use, email, help)"""
+    if parts[0] == "git" and len(parts) > 1:
+        parts = parts[1:]
+    command = parts[0]
+    args = parts[1:]
+    
+    # Comandos especiales del sistema
+    if command == "repos":
+        # Listar repositorios
+        repos = git_system.list_repositories()
+        if repos:
+            print("Repositorios disponibles:")
+            for repo in repos:
+                print(f"  - {repo}")
+        else:
+            print("No hay repositorios. Use 'git init <nombre>' para crear uno.")
+        return repos
+    elif command == "use":
+        # Seleccionar repositorio
+        if len(args) < 1:
+            print("Uso: use <nombre_repositorio>")
+            return None
+        
+        if git_system.set_current_repository(args[0]):
+            print(f"Repositorio actual: {args[0]}")
+            return True
+        print(f"El repositorio '{args[0]}' no existe.")
+        return False
+    elif command == "email":
+        # Establecer email del usuario
+        if len(args) < 1:
+            print(f"Email actual: {git_system.user_email}")
+            return git_system.user_email
+        
+        try:
+            git_system.set_user_email(args[0])
+            print(f"Email establecido: {args[0]}")
+            return True
+        except ValueError as e:
+            print(f"Error: {e}")
+            return False
+    elif command in ["flush", "sync"]:
+        # Guardar ya los cambios pendientes
+        git_system.flush()
+        print("Cambios guardados en disco.")
+        return True
+    elif command == "help":
+        # Mostrar ayuda
+        _show_help()
+        return True
+    
+    # Ejecutar comando Git
+    return git_system.execute_command(command, args)
+
+def run_batch(git_system: GitSystem, lines, flush_every: Optional[int] = None) -> List[Dict]:
+    """Ejecuta un guion de comandos sin interacción.
+
+    Cada línea es un comando como en el modo interactivo (con o sin "git"
+    delante, con comillas para argumentos con espacios; "#" comenta). Los
+    cambios se guardan cada `flush_every` comandos y al terminar, no tras
+    cada comando. Retorna la latencia de cada comando.
+    """
+    git_system.autosave = False
+    git_system.interactive = False
+    records = []
+    pending = 0  # Comandos ejecutados desde el último guardado
+    try:
+        for line_number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.lower() in ["exit", "quit", "q"]:
+                break
+            
+            try:
+                parts = shlex.split(line)
+            except ValueError as e:
+                print(f"Error en la línea {line_number}: {e}")
+                records.append({"line": line_number, "command": "?", "seconds": 0.0, "ok": False})
+                continue
+            if parts and parts[0] == "git":
+                parts = parts[1:]
+            if not parts:
+                continue
+            
+            # El subcomando forma parte del nombre (p. ej. "pr create")
+            name = " ".join(parts[:2]) if parts[0] == "pr" and len(parts) > 1 else parts[0]
+            start = time.perf_counter()
+            try:
+                result = execute_line(git_system, parts)
+                ok = result is not None and result is not False
+            except Exception as e:
+                print(f"Error en la línea {line_number}: {e}")
+                ok = False
+            records.append({"line": line_number, "command": name,
+                            "seconds": time.perf_counter() - start, "ok": ok})
+            
+            pending += 1
+            if flush_every and pending >= flush_every:
+                start = time.perf_counter()
+                git_system._save_data()
+                records.append({"line": line_number, "command": "(guardado)",
+                                "seconds": time.perf_counter() - start, "ok": True})
+                pending = 0
+    finally:
+        start = time.perf_counter()
+        git_system._save_data()
+        records.append({"line": None, "command": "(guardado)",
+                        "seconds": time.perf_counter() - start, "ok": True})
+        git_system.autosave = True
+        git_system.interactive = True
+    return records
+
+def summarize_latencies(records: List[Dict]) -> Dict[str, Dict]:
+    """Agrupa las latencias por comando: cantidad, errores, total, media, p50, p95 y máximo"""
+    by_command = OrderedDict()
+    for record in records:
+        by_command.setdefault(record["command"], []).append(record)
+    
+    summary = {}
+    for command, command_records in by_command.items():
+        times = sorted(record["seconds"] for record in command_records)
+        summary[command] = {
+            "count": len(times),
+            "errors": sum(1 for record in command_records if not record["ok"]),
+            "total": sum(times),
+            "mean": sum(times) / len(times),
+            "p50": times[(len(times) - 1) // 2],
+            "p95": times[min(len(times) - 1, int(len(times) * 0.95))],
+            "max": times[-1]
+        }
+    return summary
+
+def _print_latency_report(summary: Dict[str, Dict], out=None):
+    """Muestra el resumen de latencias en milisegundos (por defecto, en la salida de errores)"""
+    out = out or sys.stderr
+    print(f"{'Comando':<16}{'Cant.':>7}{'Errores':>9}{'Media':>10}{'p50':>10}{'p95':>10}{'Máx.':>10}", file=out)
+    for command, stats in summary.items():
+        print(f"{command:<16}{stats['count']:>7}{stats['errors']:>9}"
+              f"{stats['mean'] * 1000:>10.3f}{stats['p50'] * 1000:>10.3f}"
+              f"{stats['p95'] * 1000:>10.3f}{stats['max'] * 1000:>10.3f}", file=out)
+
+def main(argv: Optional[List[str]] = None):
     """Función principal del programa"""
-    git_system = GitSystem()
+    parser = argparse.ArgumentParser(description="Sistema de Simulación Git")
+    parser.add_argument("--batch", metavar="GUION",
+                        help="Ejecuta los comandos de un archivo ('-': entrada estándar) sin interacción")
+    parser.add_argument("--flush-every", type=int, metavar="N",
+                        help="En modo batch, guarda cada N comandos además de al terminar")
+    parser.add_argument("--report", metavar="ARCHIVO",
+                        help="En modo batch, escribe las latencias por comando en un JSON")
+    parser.add_argument("--quiet", action="store_true",
+                        help="En modo batch, descarta la salida de los comandos")
+    parser.add_argument("--write-behind", action="store_true",
+                        help="Guarda los cambios en segundo plano, agrupados, en lugar de tras cada comando")
+    parser.add_argument("--flush-interval", type=int, default=FLUSH_INTERVAL_MS, metavar="MS",
+                        help="Con --write-behind, espera máxima en milisegundos antes de guardar un cambio")
+    parser.add_argument("--flush-ops", type=int, default=FLUSH_MAX_OPERATIONS, metavar="N",
+                        help="Con --write-behind, cambios que provocan un guardado inmediato")
+    parser.add_argument("--workers", type=int, default=IO_WORKERS, metavar="N",
+                        help="Hilos para leer y guardar varios repositorios a la vez")
+    parser.add_argument("--decode-processes", type=int, default=DECODE_PROCESSES, metavar="N",
+                        help="Procesos para decodificar snapshots y diarios al cargar con --preload")
+    parser.add_argument("--preload", action="store_true",
+                        help="Carga todos los repositorios al iniciar en lugar de al usarlos")
+    options = parser.parse_args(argv)
+    
+    git_system = GitSystem(workers=options.workers, decode_processes=options.decode_processes)
+    if options.preload:
+        git_system.load_repositories()
+    
+    if options.batch:
+        script = sys.stdin if options.batch == "-" else open(options.batch, encoding="utf-8")
+        stdout = sys.stdout
+        try:
+            if options.quiet:
+                sys.stdout = open(os.devnull, "w")
+            records = run_batch(git_system, script, options.flush_every)
+        finally:
+            if options.quiet:
+                sys.stdout.close()
+                sys.stdout = stdout
+            if script is not sys.stdin:
+                script.close()
+        
+        summary = summarize_latencies(records)
+        _print_latency_report(summary)
+        if options.report:
+            with open(options.report, "w") as f:
+                json.dump({"summary": summary, "commands": records}, f, indent=2)
+        return
     
     # Cargar datos de prueba si no hay repositorios
     if git_system.repositories.is_empty():
@@ -1092,71 +4224,46 @@ def main():
     print("Sistema de Simulación Git")
     print("=========================")
     
-    while True:
-        # Mostrar el repositorio actual
-        if git_system.current_repository:
-            prompt = f"\n[{git_system.current_repository.name}] git> "
-        else:
-            prompt = "\ngit> "
-        
-        # Leer comando
-        command_line = input(prompt)
-        if not command_line:
-            continue
-        
-        # Salir del programa
-        if command_line.lower() in ["exit", "quit", "q"]:
-            break
-        
-        # Parsear el comando
-        parts = command_line.split()
-        command = parts[0]
-        args = parts[1:]
-        
-        # Comandos especiales del sistema
-        if command == "repos":
-            # Listar repositorios
-            repos = git_system.list_repositories()
-            if repos:
-                print("Repositorios disponibles:")
-                for repo in repos:
-                    print(f"  - {repo}")
+    if options.write_behind:
+        git_system.start_write_behind(options.flush_interval, options.flush_ops)
+    try:
+        while True:
+            # Mostrar el repositorio actual
+            if git_system.current_repository:
+                prompt = f"\n[{git_system.current_repository.name}] git> "
             else:
-                print("No hay repositorios. Use 'git init <nombre>' para crear uno.")
-            continue
-        elif command == "use":
-            # Seleccionar repositorio
-            if len(args) < 1:
-                print("Uso: use <nombre_repositorio>")
-                continue
+                prompt = "\ngit> "
             
-            if git_system.set_current_repository(args[0]):
-                print(f"Repositorio actual: {args[0]}")
-            else:
-                print(f"El repositorio '{args[0]}' no existe.")
-            continue
-        elif command == "email":
-            # Establecer email del usuario
-            if len(args) < 1:
-                print(f"Email actual: {git_system.user_email}")
+            # Leer comando
+            try:
+                command_line = input(prompt)
+            except EOFError:
+                break
+            if not command_line:
                 continue
             
+            # Salir del programa
+            if command_line.lower() in ["exit", "quit", "q"]:
+                break
+            
+            # Parsear y ejecutar el comando
             try:
-                git_system.set_user_email(args[0])
-                print(f"Email establecido: {args[0]}")
-            except ValueError as e:
+                execute_line(git_system, command_line.split())
+            except Exception as e:
                 print(f"Error: {e}")
-            continue
-        elif command == "help":
-            # Mostrar ayuda
-            _show_help()
-            continue
-        
-        # Ejecutar comando Git
-        try:
-            git_system.execute_command(command, args)
-        except Exception as e:
-            print(f"Error: {e}")
+    finally:
+        # Al salir (también con Ctrl+C) no debe quedar nada sin guardar
+        git_system.stop_write_behind()
+
+def _print_diff(file_diffs: List[Dict]):
+    """Muestra el resultado de un diff"""
+    if not file_diffs:
+        print("No hay diferencias.")
+        return
+    for file_diff in file_diffs:
+        print(f"diff --git a/{file_diff['path']} b/{file_diff['path']} ({file_diff['status']})")
+        for line in file_diff["diff"]:
+            print(line)
 
 def _show_help():
     """Muestra la ayuda del programa"""
@@ -1166,29 +4273,38 @@ def _show_help():
     print("  repos                  - Lista los repositorios disponibles")
     print("  use <repo>             - Selecciona un repositorio")
     print("  email [nuevo_email]    - Muestra o establece el email del usuario")
+    print("  flush, sync            - Guarda ya los cambios pendientes (escritura diferida)")
     print("  help                   - Muestra esta ayuda")
     print("  exit, quit, q          - Sale del programa")
     
     print("\nComandos Git:")
     print("  git init <nombre>      - Crea un nuevo repositorio")
     print("  git status             - Muestra el estado del repositorio")
-    print("  git log                - Muestra el historial de commits")
-    print("  git add <archivo>      - Añade un archivo al área de staging")
+    print("  git log [-n N] [--since AAAA-MM-DD] - Muestra el historial de la rama actual")
+    print("  git add <archivo|patrón>... - Añade archivos al área de staging (admite *, ? y [])")
     print("  git commit -m \"msg\"    - Crea un nuevo commit con los archivos en staging")
+    print("  git diff [<c1> [<c2>]] - Muestra las diferencias entre commits o con el head")
     print("  git checkout <rama>    - Cambia a una rama específica")
     print("  git branch <nombre>    - Crea una nueva rama")
+    print("  git pack               - Empaqueta commits y contenidos en un archivo binario")
+    print("  git unpack             - Vuelve a guardar el repositorio como JSON")
     
     print("\nComandos de Pull Request:")
-    print("  git pr create <origen> <destino> - Crea un nuevo pull request")
+    print("  git pr create <origen> <destino> [título [descripción]] - Crea un nuevo pull request")
     print("  git pr status          - Muestra el estado de los pull requests")
-    print("  git pr review <id>     - Revisa un pull request")
+    print("  git pr review <id> [revisor] - Revisa un pull request")
     print("  git pr approve <id>    - Aprueba un pull request")
     print("  git pr reject <id>     - Rechaza un pull request")
+    print("  git pr merge <id>      - Fusiona un pull request aprobado")
     print("  git pr cancel <id>     - Cancela un pull request")
     print("  git pr list            - Lista todos los pull requests")
     print("  git pr next            - Procesa el siguiente pull request pendiente")
     print("  git pr tag <id> <tag>  - Asigna una etiqueta a un pull request")
     print("  git pr clear           - Elimina todos los pull requests pendientes")
+    
+    print("\nModo batch: python main.py --batch <guion|-> [--flush-every N] [--report archivo.json] [--quiet]")
+    print("Escritura diferida: python main.py --write-behind [--flush-interval MS] [--flush-ops N]")
+    print("Carga en paralelo: python main.py --preload [--workers N] [--decode-processes N]")
 
 def _load_test_data(git_system):
     """Carga datos de prueba en el sistema"""
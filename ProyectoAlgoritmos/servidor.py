@@ -0,0 +1,221 @@
+"""Servidor asyncio para GitSystem.
+
+Acepta conexiones TCP o por socket Unix y recibe un comando JSON por línea:
+
+    {"id": 1, "command": "commit", "args": ["-m", "mensaje"]}
+    {"id": 2, "line": "pr create dev main 'Título'"}
+
+Cada conexión es una sesión (repositorio y rama actuales, email propios).
+Los comandos se ejecutan en un pool de hilos, porque guardan en disco de
+forma bloqueante, y la respuesta es otra línea JSON:
+
+    {"id": 1, "ok": true, "result": {...}, "output": "texto impreso", "seconds": 0.002}
+
+Uso:
+    python servidor.py --port 9418
+    python servidor.py --unix /tmp/git.sock --workers 8
+    python servidor.py --write-behind --flush-interval 20 --flush-ops 200
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import shlex
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from main import FLUSH_INTERVAL_MS, FLUSH_MAX_OPERATIONS, GitSystem, execute_line
+
+DEFAULT_PORT = 9418
+MAX_LINE = 1024 * 1024  # Largo máximo de una petición
+
+class _OutputCapture:
+    """Reemplaza a sys.stdout: lo que imprime cada hilo del pool mientras
+    ejecuta un comando va a su propio búfer en lugar de a la consola"""
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        return (buffer if buffer is not None else self._stream).write(text)
+
+    def flush(self):
+        if getattr(self._local, "buffer", None) is None:
+            self._stream.flush()
+
+    @contextlib.contextmanager
+    def capture(self):
+        self._local.buffer = io.StringIO()
+        try:
+            yield self._local.buffer
+        finally:
+            self._local.buffer = None
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def to_json(value):
+    """Convierte el resultado de un comando a algo serializable como JSON"""
+    if hasattr(value, "to_dict"):
+        try:
+            return value.to_dict(include_commits=False)
+        except TypeError:
+            return value.to_dict()
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    return value
+
+class GitServer:
+    """Atiende conexiones y despacha sus comandos a un GitSystem compartido"""
+    def __init__(self, git_system: GitSystem, workers: int = 8):
+        self.git_system = git_system
+        self.git_system.interactive = False  # Nadie puede responder a input()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="git")
+        self.output = _OutputCapture(sys.stdout)
+        self.requests = 0
+        self._connections = {}  # Tarea que atiende cada conexión abierta -> su writer
+
+    def _execute(self, session, parts):
+        """Ejecuta un comando en un hilo del pool, dentro de la sesión de la
+        conexión, y convierte su resultado a JSON antes de soltar el
+        repositorio: otra conexión podría estar modificándolo"""
+        with self.output.capture() as output, self.git_system.session_scope(session):
+            start = time.perf_counter()
+            try:
+                result = execute_line(self.git_system, parts)
+                ok = result is not None and result is not False
+                with self.git_system.read_scope():
+                    result = to_json(result)
+                error = None
+            except Exception as e:
+                result = None
+                ok = False
+                error = str(e)
+            seconds = time.perf_counter() - start
+        return result, ok, error, output.getvalue(), seconds
+
+    async def handle_request(self, session, request: dict) -> dict:
+        """Interpreta una petición y retorna la respuesta"""
+        if "line" in request:
+            parts = shlex.split(request["line"])
+            if parts and parts[0] == "git":
+                parts = parts[1:]
+        else:
+            parts = [request["command"]] + [str(arg) for arg in request.get("args", [])]
+        if not parts:
+            raise ValueError("La petición no tiene comando.")
+
+        loop = asyncio.get_running_loop()
+        result, ok, error, output, seconds = await loop.run_in_executor(
+            self.executor, self._execute, session, parts)
+        self.requests += 1
+        response = {"ok": ok and error is None, "result": result, "output": output, "seconds": seconds}
+        if error is not None:
+            response["error"] = error
+        return response
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Atiende una conexión: una sesión, peticiones en orden"""
+        session = self.git_system.create_session()
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Línea más larga que MAX_LINE: no se puede seguir leyendo
+                    response = {"ok": False, "error": "Petición demasiado larga."}
+                    writer.write(json.dumps(response).encode() + b"\n")
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    request_id = request.get("id")
+                    response = await self.handle_request(session, request)
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    response = {"ok": False, "error": f"Petición inválida: {e}"}
+                except Exception as e:
+                    # Un error inesperado responde a esa petición sin cerrar la conexión
+                    response = {"ok": False, "error": f"Error interno: {e}"}
+                response["id"] = request_id
+                writer.write(json.dumps(response, default=str).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, unix_path: str = None):
+        """Atiende conexiones hasta recibir SIGINT o SIGTERM"""
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, unix_path, limit=MAX_LINE)
+            where = unix_path
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_LINE)
+            where = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            # En Windows no hay manejadores: Ctrl+C llega como KeyboardInterrupt
+            with contextlib.suppress(NotImplementedError):
+                loop.add_signal_handler(signal_number, stop.set)
+
+        print(f"Servidor Git escuchando en {where}", file=sys.stderr)
+        async with server:
+            await stop.wait()
+            # Dejar de aceptar conexiones y cerrar las abiertas: cada una ve el
+            # fin de la entrada tras su comando en curso, y close() guarda lo
+            # pendiente
+            server.close()
+            for writer in list(self._connections.values()):
+                writer.transport.abort()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+        print("Servidor Git detenido", file=sys.stderr)
+
+    def close(self):
+        """Termina los comandos en curso y guarda lo pendiente"""
+        self.executor.shutdown(wait=True)
+        self.git_system.stop_write_behind()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de comandos del sistema Git simulado")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="RUTA", help="Escuchar en un socket Unix en lugar de TCP")
+    parser.add_argument("--workers", type=int, default=8, help="Hilos para ejecutar comandos")
+    parser.add_argument("--write-behind", action="store_true",
+                        help="Responder sin esperar al disco; los cambios se guardan agrupados en segundo plano")
+    parser.add_argument("--flush-interval", type=int, default=FLUSH_INTERVAL_MS, metavar="MS")
+    parser.add_argument("--flush-ops", type=int, default=FLUSH_MAX_OPERATIONS, metavar="N")
+    args = parser.parse_args(argv)
+
+    server = GitServer(GitSystem(), args.workers)
+    if args.write_behind:
+        server.git_system.start_write_behind(args.flush_interval, args.flush_ops)
+    sys.stdout = server.output
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        sys.stdout = server.output._stream
+
+if __name__ == "__main__":
+    main()
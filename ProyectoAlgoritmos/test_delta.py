@@ -0,0 +1,78 @@
+"""Pruebas de make_delta/apply_delta y de los contenidos guardados como delta."""
+import os
+import random
+import tempfile
+import unittest
+
+from main import BLOB_CACHE_SIZE, MAX_DELTA_CHAIN, BlobStore, apply_delta, make_delta
+
+def random_bytes(rng: random.Random, size: int) -> bytes:
+    return bytes(rng.choice(b"abcdefgh \n") for _ in range(size))
+
+def edit(rng: random.Random, data: bytes) -> bytes:
+    """Copia con algunos tramos insertados, borrados o reemplazados"""
+    data = bytearray(data)
+    for _ in range(rng.randint(0, 5)):
+        position = rng.randint(0, len(data))
+        action = rng.choice(["insert", "delete", "replace"])
+        piece = random_bytes(rng, rng.randint(1, 40))
+        if action == "insert":
+            data[position:position] = piece
+        elif action == "delete":
+            del data[position:position + len(piece)]
+        else:
+            data[position:position + len(piece)] = piece
+    return bytes(data)
+
+class DeltaTest(unittest.TestCase):
+    def test_round_trip(self):
+        rng = random.Random(1)
+        for _ in range(300):
+            base = random_bytes(rng, rng.randint(0, 2000))
+            target = edit(rng, base) if rng.random() < 0.8 else random_bytes(rng, rng.randint(0, 500))
+            self.assertEqual(apply_delta(base, make_delta(base, target)), target)
+
+    def test_small_change_gives_small_delta(self):
+        rng = random.Random(2)
+        base = random_bytes(rng, 100_000)
+        target = base[:50_000] + b"cambio" + base[50_000:]
+        delta = make_delta(base, target)
+        self.assertEqual(apply_delta(base, delta), target)
+        self.assertLess(len(delta), 200)
+
+    def test_wrong_base_is_rejected(self):
+        delta = make_delta(b"a" * 100, b"a" * 50 + b"b" * 50)
+        with self.assertRaises(ValueError):
+            apply_delta(b"a" * 99, delta)
+
+class BlobStoreDeltaTest(unittest.TestCase):
+    def test_versions_survive_reload(self):
+        rng = random.Random(3)
+        with tempfile.TemporaryDirectory() as directory:
+            store = BlobStore(os.path.join(directory, "objetos"))
+            versions = [random_bytes(rng, 5000).decode()]
+            checksums = [store.put(versions[0])]
+            for _ in range(3 * MAX_DELTA_CHAIN):
+                versions.append(edit(rng, versions[-1].encode()).decode())
+                checksums.append(store.put(versions[-1], base=checksums[-1]))
+            store.flush()
+
+            reloaded = BlobStore(os.path.join(directory, "objetos"))
+            for checksum, content in zip(checksums, versions):
+                self.assertEqual(reloaded.get(checksum), content)
+                self.assertLessEqual(reloaded._delta_depth(checksum), MAX_DELTA_CHAIN)
+
+    def test_saved_contents_leave_memory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = BlobStore(os.path.join(directory, "objetos"))
+            contents = [f"contenido {i}" for i in range(2 * BLOB_CACHE_SIZE)]
+            checksums = [store.put(content) for content in contents]
+            store.flush()
+            self.assertLessEqual(len(store._blobs), BLOB_CACHE_SIZE)
+            self.assertEqual(store._pinned, {})
+            # Los descartados se vuelven a leer de disco
+            for checksum, content in zip(checksums, contents):
+                self.assertEqual(store.get(checksum), content)
+
+if __name__ == "__main__":
+    unittest.main()
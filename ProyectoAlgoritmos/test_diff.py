@@ -0,0 +1,157 @@
+"""Pruebas de diff_lines, merge_lines y unified_diff con textos aleatorios,
+y del merge de pull requests que los usa."""
+import random
+import unittest
+from unittest import mock
+
+from main import File, Repository, diff_lines, merge_lines, unified_diff
+
+def lcs_length(a: list, b: list) -> int:
+    """Largo de la subsecuencia común más larga por programación dinámica"""
+    previous = [0] * (len(b) + 1)
+    for line in a:
+        current = [0]
+        for j, other in enumerate(b):
+            current.append(previous[j] + 1 if line == other else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+def random_text(rng: random.Random, size: int, alphabet: str = "abcd") -> list:
+    return [rng.choice(alphabet) + "\n" for _ in range(size)]
+
+def mutate(rng: random.Random, lines: list) -> list:
+    """Copia de un texto con algunas líneas borradas, cambiadas o insertadas"""
+    result = list(lines)
+    for _ in range(rng.randint(0, 4)):
+        position = rng.randint(0, len(result))
+        action = rng.choice(["insert", "delete", "change"])
+        if action == "insert" or not result:
+            result.insert(position, rng.choice("xyz") + "\n")
+        elif position < len(result):
+            if action == "delete":
+                del result[position]
+            else:
+                result[position] = rng.choice("xyz") + "\n"
+    return result
+
+class DiffLinesTest(unittest.TestCase):
+    def test_matches_are_a_longest_common_subsequence(self):
+        rng = random.Random(1)
+        for _ in range(500):
+            a = random_text(rng, rng.randint(0, 25))
+            b = random_text(rng, rng.randint(0, 25))
+            matches = diff_lines(a, b)
+            last_i = last_j = 0
+            for i, j, n in matches:
+                self.assertGreater(n, 0)
+                self.assertGreaterEqual(i, last_i)
+                self.assertGreaterEqual(j, last_j)
+                self.assertEqual(a[i:i + n], b[j:j + n])
+                last_i, last_j = i + n, j + n
+            self.assertEqual(sum(n for _, _, n in matches), lcs_length(a, b), (a, b))
+
+    def test_identical_and_empty(self):
+        text = ["a\n", "b\n"]
+        self.assertEqual(diff_lines(text, text), [(0, 0, 2)])
+        self.assertEqual(diff_lines([], text), [])
+        self.assertEqual(diff_lines(text, []), [])
+
+class MergeLinesTest(unittest.TestCase):
+    def test_one_side_changed(self):
+        rng = random.Random(2)
+        for _ in range(300):
+            base = random_text(rng, rng.randint(0, 20))
+            changed = mutate(rng, base)
+            self.assertEqual(merge_lines(base, changed, base), (changed, []))
+            self.assertEqual(merge_lines(base, base, changed), (changed, []))
+            self.assertEqual(merge_lines(base, changed, changed), (changed, []))
+
+    def test_separate_changes_are_combined(self):
+        base = [f"{i}\n" for i in range(10)]
+        ours = list(base)
+        ours[1] = "nuestro\n"
+        theirs = list(base)
+        theirs[8] = "suyo\n"
+        merged, conflicts = merge_lines(base, ours, theirs)
+        self.assertEqual(conflicts, [])
+        self.assertEqual(merged[1], "nuestro\n")
+        self.assertEqual(merged[8], "suyo\n")
+        self.assertEqual(len(merged), 10)
+
+    def test_conflict_is_marked(self):
+        merged, conflicts = merge_lines(["a\n", "b\n", "c\n"], ["a\n", "X\n", "c\n"],
+                                        ["a\n", "Y\n", "c\n"], "main", "rama")
+        self.assertEqual(merged, ["a\n", "<<<<<<< main\n", "X\n", "=======\n",
+                                  "Y\n", ">>>>>>> rama\n", "c\n"])
+        self.assertEqual(conflicts, [{"base_line": 2, "ours_lines": 1, "theirs_lines": 1}])
+
+class UnifiedDiffTest(unittest.TestCase):
+    def apply(self, a: list, diff: list) -> list:
+        """Aplica un diff unificado a `a` y retorna el resultado"""
+        result = []
+        position = 0
+        for line in diff:
+            if line.startswith("@@"):
+                old_range = line.split()[1][1:]
+                start, count = map(int, old_range.split(","))
+                start = start - 1 if count else start
+                result.extend(line.rstrip("\n") for line in a[position:start])
+                position = start
+            elif line[0] == "+":
+                result.append(line[1:])
+            else:
+                self.assertEqual(line[1:], a[position].rstrip("\n"))
+                position += 1
+                if line[0] == " ":
+                    result.append(line[1:])
+        result.extend(line.rstrip("\n") for line in a[position:])
+        return result
+
+    def test_patch_reproduces_new_text(self):
+        rng = random.Random(3)
+        for _ in range(300):
+            a = random_text(rng, rng.randint(0, 30))
+            b = mutate(rng, a)
+            diff = unified_diff(a, b, context=rng.randint(0, 3))
+            self.assertEqual(self.apply(a, diff), [line.rstrip("\n") for line in b])
+            if a == b:
+                self.assertEqual(diff, [])
+
+    def test_header(self):
+        self.assertEqual(unified_diff(["a\n", "b\n"], ["a\n", "c\n"]), ["@@ -1,2 +1,2 @@", " a", "-b", "+c"])
+
+class MergePullRequestTest(unittest.TestCase):
+    def setUp(self):
+        # main y dev avanzan por separado desde un commit común
+        self.repo = Repository("r", "./r")
+        self.commit("base.txt", "main")
+        self.repo.create_branch("dev")
+        self.commit("main.txt", "main")
+        self.repo.checkout_branch("dev")
+        self.commit("dev.txt", "dev")
+        self.pr = self.repo.create_pull_request("PR", "", "test@example.com", "dev", "main")
+        self.repo.approve_pull_request(self.pr.id)
+
+    def commit(self, name: str, content: str):
+        self.repo.add_file_to_staging(File(name, content))
+        self.repo.create_commit(name, "test@example.com")
+
+    def test_merge_commit_has_both_heads(self):
+        main_head = self.repo.get_branch("main").head_commit_id
+        dev_head = self.repo.get_branch("dev").head_commit_id
+        self.assertTrue(self.repo.merge_pull_request(self.pr.id))
+        merge = self.repo.get_commit_by_id(self.repo.get_branch("main").head_commit_id)
+        self.assertEqual(merge.parent_ids, [main_head, dev_head])
+        self.assertEqual(self.pr.status, "merged")
+
+    def test_failed_merge_leaves_pull_request_approved(self):
+        main_head = self.repo.get_branch("main").head_commit_id
+        with mock.patch.object(self.repo, "_merge_snapshots", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.repo.merge_pull_request(self.pr.id)
+        self.assertEqual(self.pr.status, "approved")
+        self.assertEqual(self.repo.pull_requests.by_status("merged"), [])
+        self.assertEqual(self.repo.get_branch("main").head_commit_id, main_head)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""Pruebas de CommitGraph contra búsquedas de ancestros por fuerza bruta
+sobre grafos de commits aleatorios."""
+import random
+import unittest
+
+from main import Commit, CommitGraph
+
+def random_dag(rng: random.Random, size: int) -> dict:
+    """Commits con entre cero y tres padres elegidos entre los anteriores"""
+    commits = {}
+    ids = []
+    for i in range(size):
+        commit = Commit(f"Commit {i}", "test@example.com", commit_id=f"c{i:04d}", timestamp=float(i))
+        if ids:
+            for parent_id in rng.sample(ids, min(len(ids), rng.choice([1, 1, 1, 2, 3]))):
+                commit.add_parent(parent_id)
+        commits[commit.id] = commit
+        ids.append(commit.id)
+    return commits
+
+def ancestors(commits: dict, commit_id: str) -> set:
+    """Ancestros de un commit (incluido) recorriendo todos los padres"""
+    seen = set()
+    stack = [commit_id]
+    while stack:
+        current = stack.pop()
+        if current not in seen:
+            seen.add(current)
+            stack.extend(commits[current].parent_ids)
+    return seen
+
+class CommitGraphTest(unittest.TestCase):
+    def check_graph(self, seed: int, precompute: bool):
+        rng = random.Random(seed)
+        commits = random_dag(rng, rng.randint(1, 40))
+        graph = CommitGraph(commits.get)
+        if precompute:
+            for commit_id in commits:
+                graph.generation(commit_id)
+        reach = {commit_id: ancestors(commits, commit_id) for commit_id in commits}
+        ids = list(commits)
+
+        for _ in range(30):
+            first, second = rng.choice(ids), rng.choice(ids)
+            self.assertEqual(graph.is_ancestor(first, second), first in reach[second],
+                             f"is_ancestor({first}, {second})")
+
+            common = reach[first] & reach[second]
+            base = graph.merge_base(first, second)
+            if not common:
+                self.assertIsNone(base)
+            else:
+                self.assertIn(base, common)
+                # Ningún otro ancestro común desciende de la base elegida
+                self.assertFalse(any(base in reach[other] and other != base for other in common))
+
+            between = [commit.id for commit in graph.commits_between(first, second)]
+            self.assertEqual(set(between), reach[second] - reach[first])
+            self.assertEqual(len(between), len(set(between)))
+
+            walked = [commit.id for commit in graph.walk([second])]
+            self.assertEqual(set(walked), reach[second])
+            # Cada commit aparece antes que todos sus padres
+            position = {commit_id: i for i, commit_id in enumerate(walked)}
+            for commit_id in walked:
+                for parent_id in commits[commit_id].parent_ids:
+                    self.assertLess(position[commit_id], position[parent_id])
+
+    def test_random_graphs_lazy_generations(self):
+        for seed in range(200):
+            self.check_graph(seed, precompute=False)
+
+    def test_random_graphs_precomputed_generations(self):
+        for seed in range(200):
+            self.check_graph(seed, precompute=True)
+
+    def test_walk_by_date(self):
+        # main: a0(100) -> m1(500); rama: b1(101) desde a0; merge mg(700)
+        commits = {}
+        for commit_id, timestamp, parents in (("a0", 100, []), ("m1", 500, ["a0"]),
+                                              ("b1", 101, ["a0"]), ("mg", 700, ["m1", "b1"])):
+            commit = Commit(commit_id, "test@example.com", commit_id=commit_id, timestamp=float(timestamp))
+            for parent_id in parents:
+                commit.add_parent(parent_id)
+            commits[commit_id] = commit
+        graph = CommitGraph(commits.get)
+        self.assertEqual([commit.id for commit in graph.walk_by_date(["mg"])], ["mg", "m1", "b1", "a0"])
+
+    def test_is_ancestor_without_generations(self):
+        # Commits antiguos: generación 0 hasta que se calcula
+        commits = {}
+        previous = None
+        for i in range(5):
+            commit = Commit(f"Commit {i}", "test@example.com", commit_id=f"c{i}")
+            if previous:
+                commit.set_parent(previous)
+            commits[commit.id] = commit
+            previous = commit.id
+        graph = CommitGraph(commits.get)
+        self.assertTrue(graph.is_ancestor("c1", "c4"))
+        self.assertFalse(graph.is_ancestor("c4", "c1"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+"""Pruebas de PersistentMap contra un diccionario, con operaciones aleatorias."""
+import random
+import unittest
+
+from main import PersistentMap
+
+class CollidingKey:
+    """Clave cuyo hash se repite a propósito, para probar los nodos de colisión"""
+    def __init__(self, value: int):
+        self.value = value
+
+    def __hash__(self):
+        return self.value % 3
+
+    def __eq__(self, other):
+        return isinstance(other, CollidingKey) and other.value == self.value
+
+    def __repr__(self):
+        return f"CollidingKey({self.value})"
+
+class PersistentMapTest(unittest.TestCase):
+    def check_against_dict(self, make_key, seed: int):
+        rng = random.Random(seed)
+        versions = [(PersistentMap(), {})]
+        for _ in range(2000):
+            current, expected = versions[-1]
+            key = make_key(rng.randint(0, 300))
+            if rng.random() < 0.7:
+                value = rng.randint(0, 5)
+                current = current.set(key, value)
+                expected = {**expected, key: value}
+            else:
+                current = current.delete(key)
+                expected = {k: v for k, v in expected.items() if k != key}
+            versions.append((current, expected))
+
+        for current, expected in versions[::50] + versions[-1:]:
+            self.assertEqual(len(current), len(expected))
+            self.assertEqual(dict(current.items()), expected)
+            self.assertEqual(set(current), set(expected))
+            for key, value in expected.items():
+                self.assertIn(key, current)
+                self.assertEqual(current[key], value)
+                self.assertEqual(current.get(key), value)
+            self.assertIsNone(current.get(make_key(-1)))
+            self.assertNotIn(make_key(-1), current)
+
+        # diff entre versiones cualesquiera
+        for _ in range(50):
+            (first, first_dict), (second, second_dict) = rng.sample(versions, 2)
+            expected_diff = {key: (first_dict.get(key), second_dict.get(key))
+                             for key in first_dict.keys() | second_dict.keys()
+                             if first_dict.get(key) != second_dict.get(key)}
+            got = {key: (mine, theirs) for key, mine, theirs in first.diff(second)}
+            self.assertEqual(got, expected_diff)
+
+    def test_string_keys(self):
+        self.check_against_dict(lambda value: f"src/archivo_{value}.py", seed=1)
+
+    def test_colliding_keys(self):
+        self.check_against_dict(CollidingKey, seed=2)
+
+    def test_old_versions_are_unchanged(self):
+        first = PersistentMap().set("a", 1)
+        second = first.set("a", 2).set("b", 3)
+        third = second.delete("a")
+        self.assertEqual(dict(first.items()), {"a": 1})
+        self.assertEqual(dict(second.items()), {"a": 2, "b": 3})
+        self.assertEqual(dict(third.items()), {"b": 3})
+        with self.assertRaises(KeyError):
+            third["a"]
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""Pruebas de dos GitSystem (como dos procesos) sobre el mismo data/."""
+import os
+import tempfile
+import unittest
+
+from main import GitSystem, execute_line
+
+class SharedDataTest(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)  # data/ se crea en el directorio actual
+        setup = GitSystem()
+        for line in ["init r", "add README.md", "commit -m inicial"]:
+            execute_line(setup, line.split())
+        # Los dos leen el repositorio antes de que el otro lo modifique
+        self.first = self.open_system()
+        self.second = self.open_system()
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def open_system(self) -> GitSystem:
+        git = GitSystem()
+        git.interactive = False
+        execute_line(git, ["use", "r"])
+        return git
+
+    def work_on_branch(self, git: GitSystem, branch: str):
+        for line in [f"branch {branch}", f"checkout {branch}", f"add {branch}.txt", f"commit -m {branch}"]:
+            self.assertTrue(execute_line(git, line.split()), line)
+
+    def test_changes_from_both_systems_are_kept(self):
+        self.work_on_branch(self.first, "p1")
+        self.work_on_branch(self.second, "p2")
+
+        repo = self.open_system().get_repository("r")
+        self.assertEqual(sorted(repo.branches), ["main", "p1", "p2"])
+        for branch in ["p1", "p2"]:
+            head = repo.get_commit_by_id(repo.get_branch(branch).head_commit_id)
+            self.assertEqual(head.message, branch)
+
+    def test_stale_unsaved_changes_are_refused(self):
+        self.first.autosave = False
+        self.work_on_branch(self.first, "p1")
+        self.work_on_branch(self.second, "p2")
+
+        with self.assertRaises(RuntimeError):
+            self.first.flush()
+        # El siguiente comando trabaja sobre lo que guardó el otro
+        self.work_on_branch(self.first, "p3")
+        self.first.flush()
+        repo = self.open_system().get_repository("r")
+        self.assertEqual(sorted(repo.branches), ["main", "p2", "p3"])
+
+if __name__ == "__main__":
+    unittest.main()
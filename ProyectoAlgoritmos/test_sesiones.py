@@ -0,0 +1,40 @@
+"""Pruebas de varias sesiones sobre los mismos repositorios."""
+import os
+import tempfile
+import unittest
+
+from main import GitSystem, execute_line
+
+class SessionTest(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)  # data/ se crea en el directorio actual
+        self.git = GitSystem()
+        self.git.interactive = False
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def run_in(self, session, line):
+        with self.git.session_scope(session):
+            return execute_line(self.git, line.split())
+
+    def test_commit_only_takes_own_staged_files(self):
+        first = self.git.create_session()
+        second = self.git.create_session()
+        self.run_in(first, "init r")
+        self.run_in(second, "use r")
+
+        self.run_in(first, "add a.txt")
+        self.run_in(second, "add b.txt")
+        self.assertEqual(self.run_in(second, "status")["staged_files"], ["b.txt"])
+
+        commit = self.run_in(first, "commit -m uno")
+        self.assertEqual([file["path"] for file in commit["files"]], ["a.txt"])
+        commit = self.run_in(second, "commit -m dos")
+        self.assertEqual([file["path"] for file in commit["files"]], ["b.txt"])
+
+if __name__ == "__main__":
+    unittest.main()
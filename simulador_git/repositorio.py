@@ -36,9 +36,16 @@ class Repositorio:
     def merge(self, rama_externa):
         for i, r in enumerate(self.ramas):
             if r.nombre_rama == rama_externa:
-                self.ramas[self.index].commits.extend(r.commits) # Esto lo que hace es unir las 2 listas de los commits
-                # Si quisiera solo tomar el ultimo commit uso commits.extend(r.commits[0])
-                self.ramas[self.index].commits[0].msj_commit = 'Se realizó un merge'
+                rama = self.ramas[self.index]
+                ids_actuales = {commit.id for commit in rama.commits}
+                # Solo se agregan los commits que la rama actual todavia no tiene, ordenados
+                # por fecha junto a los suyos (la lista va del mas nuevo al mas viejo)
+                nuevos = [commit for commit in r.commits if commit.id not in ids_actuales]
+                rama.commits = sorted(rama.commits + nuevos, key=lambda commit: commit.date, reverse=True)
+                # Los archivos de la rama externa se suman a los de la rama actual
+                rama.archivos.update(r.archivos)
+                # Se crea un commit de merge en vez de renombrar el ultimo commit
+                rama.commits.insert(0, Commit(randint(1000, 9999), 'Se realizó un merge', dict(rama.archivos), rama.commits[0].msj_commit))
                 break
 
     # Muestra las ramas disponibles